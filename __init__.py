@@ -15,7 +15,7 @@ bl_info = {
     "name": "GP clipboard",
     "description": "Copy/Cut/Paste Grease Pencil strokes to/from OS clipboard across layers and blends",
     "author": "Samuel Bernou",
-    "version": (1, 3, 3),
+    "version": (1, 4, 0),
     "blender": (2, 83, 0),
     "location": "View3D > Toolbar > Gpencil > GP clipboard",
     "warning": "",
@@ -24,13 +24,24 @@ bl_info = {
     "category": "Object" }
 
 import bpy
+from bpy.app.handlers import persistent
 import os
 import mathutils
-from mathutils import Vector
+from mathutils import Vector, Matrix, Euler, Quaternion
 import json
-from time import time
-from operator import itemgetter
-from itertools import groupby
+import functools
+import mmap
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from time import time, perf_counter
+from contextlib import ExitStack
+from bisect import bisect_left, bisect_right
+from . import clipformat
+from . import clipstore
+from . import clipshm
+from .clipcache import decoded_cache, encoded_cache, content_key, payload_size
+from .cliphistory import history
+from .timing import tracer, phase, count, peak
 # from pprint import pprint
 
 def convertAttr(Attr):
@@ -58,19 +69,100 @@ def getMatrix (layer) :
 
     return matrix.copy()
 
+class TransformCache:
+    '''Combined world matrix (object matrix @ layer parent matrix) and its inverse
+    computed once per (object, layer, frame) instead of once per point.
+    Shared by copy, cut and paste, cleared on frame change and depsgraph update
+    '''
+
+    def __init__(self):
+        self.matrices = {}
+
+    def get(self, obj, layer, frame=None):
+        '''return (world matrix, inverted world matrix) of given layer'''
+        if frame is None:
+            frame = bpy.context.scene.frame_current
+        key = (obj.name, layer.info, frame)
+        mats = self.matrices.get(key)
+        if mats is None:
+            mat = obj.matrix_world @ getMatrix(layer)
+            mats = self.matrices[key] = (mat, mat.inverted())
+        return mats
+
+    def world(self, obj, layer, frame=None):
+        return self.get(obj, layer, frame)[0]
+
+    def world_inverted(self, obj, layer, frame=None):
+        return self.get(obj, layer, frame)[1]
+
+    def clear(self):
+        self.matrices.clear()
+
+transform_cache = TransformCache()
+
+@persistent
+def clear_transform_cache(*args):
+    transform_cache.clear()
+
 default_pt_uv_fill = Vector((0.5, 0.5))
 
-def dump_gp_point(p, l, obj):
-    '''add properties of a given points to a dic and return it'''
+## point attributes read in bulk with foreach_get: (name, item size, dtype)
+point_array_attrs = (
+    ('co', 3, np.float32),
+    ('pressure', 1, np.float32),
+    ('strength', 1, np.float32),
+    ('vertex_color', 4, np.float32),
+    ('uv_fill', 2, np.float32),
+    ('uv_factor', 1, np.float32),
+    ('uv_rotation', 1, np.float32),
+    ('select', 1, bool),
+)
+
+## attributes of dumped points (selection is only read by cut)
+dumped_point_attrs = tuple(attr for attr in point_array_attrs if attr[0] != 'select')
+
+## use foreach_get batched extraction (per point dump_gp_point is used as fallback)
+use_array_engine = True
+
+def has_array_access(points):
+    '''Return True if points attributes can be read and written in batch (foreach_get / foreach_set)
+    attributes missing in this blender version are skipped by get_points_arrays
+    '''
+    return hasattr(points, 'foreach_get') and hasattr(points, 'foreach_set')
+
+def get_points_arrays(points, attrs=point_array_attrs):
+    '''Return a dic of numpy arrays of points attributes
+    (one foreach_get call per attribute for the whole stroke)
+    '''
+    n = len(points)
+    arrays = {}
+    for att, size, dtype in attrs:
+        if n and not hasattr(points[0], att):
+            continue# attribute not available in this blender version
+        buf = np.empty(n * size, dtype=dtype)
+        points.foreach_get(att, buf)
+        arrays[att] = buf.reshape(n, size) if size > 1 else buf
+    return arrays
+
+def matrix_to_array(mat):
+    '''Convert a mathutils 4x4 matrix to a numpy array'''
+    return np.array([row[:] for row in mat], dtype=np.float64)
+
+def transform_coords(co, mat):
+    '''Apply a 4x4 matrix to a (n, 3) coordinate array in a single product'''
+    m = matrix_to_array(mat)
+    return co @ m[:3, :3].T + m[:3, 3]
+
+def dump_gp_point(p, l, obj, matrix=None):
+    '''add properties of a given points to a dic and return it
+    matrix is the world matrix to use (default to layer world matrix at current frame)
+    '''
     pdic = {}
     #point_attr_list = ('co', 'pressure', 'select', 'strength') #select#'rna_type'
     #for att in point_attr_list:
     #    pdic[att] = convertAttr(getattr(p, att))
-    if l.parent:
-        mat = getMatrix(l)
-        pdic['co'] = convertAttr(obj.matrix_world @ mat @ getattr(p,'co'))
-    else:
-        pdic['co'] = convertAttr(obj.matrix_world @ getattr(p,'co'))
+    mat = matrix if matrix is not None else transform_cache.world(obj, l)
+    pdic['co'] = convertAttr(mat @ getattr(p,'co'))
     pdic['pressure'] = convertAttr(getattr(p,'pressure'))
     # pdic['select'] = convertAttr(getattr(p,'select'))# need selection ? 
     pdic['strength'] = convertAttr(getattr(p,'strength'))
@@ -89,12 +181,80 @@ def dump_gp_point(p, l, obj):
 
     return pdic
 
-
-def dump_gp_stroke_range(s, sid, l, obj):
+def dump_gp_points_array(s, sid, l, obj, matrix=None, arrays=None):
+    '''Batched equivalent of dump_gp_point for all points of a stroke
+    (or only the points indexes in sid), return a dic of world space arrays
+    arrays can be passed if points attributes were already read
+    '''
+    if arrays is None:
+        arrays = get_points_arrays(s.points)
+    arrays = {k: v for k, v in arrays.items() if k != 'select'}# selection is not dumped
+    if isinstance(sid, range) and sid.step == 1:
+        sid = slice(sid.start, sid.stop)
+    if sid is not None:
+        arrays = {k: v[sid] for k, v in arrays.items()}
+
+    if matrix is None:
+        matrix = transform_cache.world(obj, l)
+    with phase('transform'):
+        arrays['co'] = transform_coords(arrays['co'], matrix)
+    return arrays
+
+def arrays_to_points(arrays):
+    '''Convert a dic of points arrays to a json serializable list of point dics'''
+    co = np.asarray(arrays['co'], dtype=np.float64).tolist()
+    pressure = np.asarray(arrays['pressure']).tolist()
+    strength = np.asarray(arrays['strength']).tolist()
+    points = [{'co': c, 'pressure': p, 'strength': st} for c, p, st in zip(co, pressure, strength)]
+
+    ## dump following attributes only where they are non default
+    vertex_color = arrays.get('vertex_color')
+    if vertex_color is not None:
+        for i in np.flatnonzero(np.any(vertex_color, axis=1)).tolist():
+            points[i]['vertex_color'] = vertex_color[i].tolist()
+
+    uv_fill = arrays.get('uv_fill')
+    if uv_fill is not None:
+        for i in np.flatnonzero(np.any(uv_fill != default_pt_uv_fill[:], axis=1)).tolist():
+            points[i]['uv_fill'] = uv_fill[i].tolist()
+
+    for att in ('uv_factor', 'uv_rotation'):
+        values = arrays.get(att)
+        if values is None:
+            continue
+        for i in np.flatnonzero(values).tolist():
+            points[i][att] = float(values[i])
+
+    return points
+
+
+def dump_gp_stroke_range(s, sid, l, obj, as_arrays=False, matrix=None, arrays=None):
     '''Get a grease pencil stroke and return a dic with attribute
     (points attribute being a dic of dics to store points and their attributes)
+    if as_arrays is True, points attribute is a dic of arrays (one per point attribute)
+    matrix is the world matrix to use (default to layer world matrix at current frame)
+    arrays can be passed if points attributes were already read with get_points_arrays
     '''
+    sdic = dump_gp_stroke_attributes(s)
+
+    if use_array_engine and has_array_access(s.points):
+        arrays = dump_gp_points_array(s, sid, l, obj, matrix, arrays)
+        sdic['points'] = arrays if as_arrays else arrays_to_points(arrays)
+        return sdic
+    count('point_dump_fallback')
 
+    points = []
+    if sid is None:#no ids, just full points...
+        for p in s.points:
+            points.append(dump_gp_point(p,l,obj,matrix))
+    else:
+        for pid in sid:
+            points.append(dump_gp_point(s.points[pid],l,obj,matrix))
+    sdic['points'] = points_to_arrays(points)[0] if as_arrays else points
+    return sdic
+
+def dump_gp_stroke_attributes(s):
+    '''Return a dic of the stroke attributes (without points)'''
     sdic = {}
     stroke_attr_list = ('line_width',) #'select'#read-only: 'triangles'
     for att in stroke_attr_list:
@@ -124,27 +284,87 @@ def dump_gp_stroke_range(s, sid, l, obj):
 
     if s.vertex_color_fill[:] != (0,0,0,0):
         sdic['vertex_color_fill'] = convertAttr(s.vertex_color_fill)
-
-    points = []
-    if sid is None:#no ids, just full points...
-        for p in s.points:
-            points.append(dump_gp_point(p,l,obj))
-    else:
-        for pid in sid:
-            points.append(dump_gp_point(s.points[pid],l,obj))
-    sdic['points'] = points
     return sdic
 
 
 
-def copycut_strokes(layers=None, copy=True, keep_empty=True):# (mayber allow filter)
+def is_cyclic(s):
+    '''Return True if stroke is closed (attribute name changed in 2.92)'''
+    return bool(getattr(s, 'use_cyclic', None) or getattr(s, 'draw_cyclic', None))
+
+def selection_runs(mask, pad=0, cyclic=False):
+    '''Return list of (start, stop) index pairs of the contiguous True runs of a boolean mask
+    pad extend each run on both sides (to avoid gap on cut)
+    if cyclic, runs touching both ends of the stroke are joined and padding wrap around:
+    stop can then be greater than the number of points (see run_indices)
+    '''
+    mask = np.asarray(mask, dtype=bool)
+    n = len(mask)
+    edges = np.diff(np.concatenate(([0], mask.astype(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    stops = np.flatnonzero(edges == -1)
+
+    if cyclic and len(starts) > 1 and mask[0] and mask[-1]:
+        # first run continue the last one
+        stops[-1] = n + stops[0]
+        starts, stops = starts[1:], stops[1:]
+
+    if pad:
+        starts = starts - pad
+        stops = stops + pad
+        if cyclic:
+            wrap = starts < 0
+            starts[wrap] += n
+            stops[wrap] += n
+            stops = np.minimum(stops, starts + n)
+        else:
+            starts = np.maximum(starts, 0)
+            stops = np.minimum(stops, n)
+
+    return list(zip(starts.tolist(), stops.tolist()))
+
+def run_indices(start, stop, n):
+    '''Points indexes of a run from selection_runs (wrap around end of cyclic strokes)'''
+    if stop <= n:
+        return range(start, stop)
+    return [i % n for i in range(start, stop)]
+
+def run_values(values, start, stop):
+    '''Slice of an array for a run from selection_runs (wrap around end of cyclic strokes)'''
+    if stop <= len(values):
+        return values[start:stop]
+    return np.take(values, np.arange(start, stop), axis=0, mode='wrap')
+
+## stroke attributes transfered when a stroke is split (only those available in this version)
+stroke_attr_names = ('line_width', 'material_index', 'display_mode', 'start_cap_mode', 'end_cap_mode',
+    'hardness', 'uv_scale', 'uv_rotation', 'uv_translation', 'vertex_color_fill')
+
+def add_stroke_segments(s, f, arrays, runs):
+    '''Create a new stroke on frame f for each (start, stop) points run of stroke s
+    points are written directly from the local space arrays of the source stroke
+    (no world space round trip), segments of a cyclic stroke are open
+    '''
+    attrs = {att: getattr(s, att) for att in stroke_attr_names if hasattr(s, att)}
+    segments = []
+    for start, stop in runs:
+        if stop - start < 2:#avoid isolated points
+            continue
+        ns = f.strokes.new()
+        for att, val in attrs.items():
+            setattr(ns, att, val)
+        ns.points.add(stop - start)
+        set_points_arrays(ns.points, {k: run_values(v, start, stop) for k, v in arrays.items() if k != 'select'})
+        ns.points.update()
+        segments.append(ns)
+    return segments
+
+def copycut_strokes(layers=None, copy=True, keep_empty=True, as_arrays=False):# (mayber allow filter)
     '''
     copy all visibles selected strokes on active frame
     layers can be None, a single layer object or list of layer object as filter 
     if keep_empty is False the frame is deleted when all strokes are cutted
+    if as_arrays is True, stroke points are dumped as a dic of arrays
     '''
-    t0 = time()
-
     ### must iterate in all layers ! (since all layers are selectable / visible !)
     obj = bpy.context.object
     gp = obj.data
@@ -164,65 +384,33 @@ def copycut_strokes(layers=None, copy=True, keep_empty=True):# (mayber allow fil
         f = l.active_frame
 
         if f:#active frame can be None
-            if not copy:
-                staylist = []#init part of strokes that must survive on this layer
+            cutted = []# (stroke, points arrays, surviving runs), processed in batch after iteration
 
             for s in f.strokes:
                 if s.select:
-                    # separate in multiple stroke if parts of the strokes a selected.
-                    sel = [i for i, p in enumerate(s.points) if p.select]
-                    substrokes = []# list of list containing isolated selection
-                    for k, g in groupby(enumerate(sel), lambda x:x[0]-x[1]):# continuity stroke have same substract result between point index and enumerator
-                        group = list(map(itemgetter(1), g))
-                        substrokes.append(group)
+                    # read all points attributes once, used for copy and cut
+                    arrays = get_points_arrays(s.points)
+                    mask = arrays['select']
 
-                    for ss in substrokes:
-                        if len(ss) > 1:#avoid copy isolated points
-                            stroke_list.append(dump_gp_stroke_range(s,ss,l,obj))
+                    # separate in multiple stroke if parts of the strokes a selected.
+                    cyclic = is_cyclic(s)
+                    for start, stop in selection_runs(mask, cyclic=cyclic):
+                        if stop - start > 1:#avoid copy isolated points
+                            ss = run_indices(start, stop, len(mask))
+                            stroke_list.append(dump_gp_stroke_range(s,ss,l,obj,as_arrays,arrays=arrays))
 
                     #Cutting operation
                     if not copy:
-                        maxindex = len(s.points)-1
-                        if len(substrokes) == maxindex+1:#si un seul substroke, c'est le stroke entier
-                            f.strokes.remove(s)
-                        else:
-                            neg = [i for i, p in enumerate(s.points) if not p.select]
-
-                            staying = []
-                            for k, g in groupby(enumerate(neg), lambda x:x[0]-x[1]):
-                                group = list(map(itemgetter(1), g))
-                                #extend group to avoid gap when cut, a bit dirty
-                                if group[0] > 0:
-                                    group.insert(0,group[0]-1)
-                                if group[-1] < maxindex:
-                                    group.append(group[-1]+1)
-                                staying.append(group)
-
-                            for ns in staying:
-                                 if len(ns) > 1:
-                                    staylist.append(dump_gp_stroke_range(s,ns,l,obj))
-                            #make a negative list containing all last index
-
-
-                    '''#full stroke version
-                    # if s.colorname == color: #line for future filters
-                    stroke_list.append(dump_gp_stroke(s,l))
-                    #delete stroke on the fly
-                    if not copy:
-                        f.strokes.remove(s)
-                    '''
-
-            if not copy:
-                # delete all selected strokes...
-                for s in f.strokes:
-                    if s.select:
-                        f.strokes.remove(s)
-                # ...recreate these uncutted ones
-                #pprint(staylist)
-                if staylist:
-                    add_multiple_strokes(staylist, l)
-                #for ns in staylist:#weirdly recreate the stroke twice !
-                #    add_stroke(ns, f, l)
+                        # runs that must survive, extended to avoid gap when cut
+                        staying = selection_runs(~mask, pad=1, cyclic=cyclic)
+                        cutted.append((s, arrays, staying))
+
+            # recreate uncutted parts directly from local space source arrays...
+            for s, arrays, staying in cutted:
+                add_stroke_segments(s, f, arrays, staying)
+            # ...and delete all cutted strokes
+            for s, _arrays, _staying in cutted:
+                f.strokes.remove(s)
 
             #if nothing left on the frame choose to leave an empty frame or delete it (let previous frame appear)
             if not copy and not keep_empty:#
@@ -231,8 +419,7 @@ def copycut_strokes(layers=None, copy=True, keep_empty=True):# (mayber allow fil
 
 
 
-    print(len(stroke_list), 'strokes copied in', time()-t0, 'seconds')
-    #print(stroke_list)
+    count('strokes', len(stroke_list))
     return stroke_list
 
 
@@ -275,15 +462,15 @@ def copy_all_strokes(layers=None):
     return stroke_list
 """
 
-def copy_all_strokes_in_frame(frame=None, layers=None, obj=None):
+def copy_all_strokes_in_frame(frame=None, layers=None, obj=None, as_arrays=False, matrix=None):
     '''
     copy all stroke, not affected by selection on active frame
     layers can be None, a single layer object or list of layer object as filter 
-    if keep_empty is False the frame is deleted when all strokes are cutted
+    when a single layer is passed, strokes are taken from given frame instead of active frame
+    if as_arrays is True, stroke points are dumped as a dic of arrays
+    matrix is the world matrix to use (default to layer world matrix at current frame)
     '''
-    t0 = time()
-    scene = bpy.context.scene
-    obj = bpy.context.object
+    obj = obj or bpy.context.object
     gp = obj.data
     gpl = gp.layers
     
@@ -300,7 +487,8 @@ def copy_all_strokes_in_frame(frame=None, layers=None, obj=None):
     stroke_list = []
 
     for l in layers:
-        f = l.active_frame
+        # a frame belong to a single layer
+        f = frame if len(layers) == 1 else l.active_frame
 
         if not f:
             continue# active frame can be None
@@ -308,54 +496,249 @@ def copy_all_strokes_in_frame(frame=None, layers=None, obj=None):
         for s in f.strokes:
             ## full stroke version
             # if s.select:
-            # send index of all points to get the whole stroke with "range"
-            stroke_list.append( dump_gp_stroke_range(s, [i for i in range(len(s.points))], l, obj) )
+            # no index list to get the whole stroke
+            stroke_list.append( dump_gp_stroke_range(s, None, l, obj, as_arrays, matrix) )
 
-    print(len(stroke_list), 'strokes copied in', time()-t0, 'seconds')
-    #print(stroke_list)
+    count('strokes', len(stroke_list))
     return stroke_list
 
-def add_stroke(s, frame, layer, obj):
-    '''add stroke on a given frame, (layer is for parentage setting)'''
-    # print(3*'-',s)
-    ns = frame.strokes.new()
+def copy_frame_cached(frame, layer, obj, matrix, settings, frame_key):
+    '''Arrays dump of all strokes of a layer frame (see copy_all_strokes_in_frame) through the encoded cache
+    raw points arrays are read and fingerprinted with the matrix and encoding settings before extraction,
+    a frame unchanged since a previous copy reuse its stroke list (and block in encode_layer) without transform
+    settings: see payload_settings, frame_key: hashable id of the copied frame
+    '''
+    cache = settings['cache']
+    if cache is None or not use_array_engine or not all(has_array_access(s.points) for s in frame.strokes):
+        return copy_all_strokes_in_frame(frame=frame, layers=layer, obj=obj, as_arrays=True, matrix=matrix)
+
+    raw = [dict(dump_gp_stroke_attributes(s), points=get_points_arrays(s.points, dumped_point_attrs))
+        for s in frame.strokes]
+    block_settings = [not settings['shared'], settings['bits'], settings['half']]
+    fingerprint = clipformat.strokes_fingerprint(raw, [block_settings, matrix_to_array(matrix).tolist()])
+
+    strokes = cache.frame(frame_key, fingerprint)
+    if strokes is not None:
+        return strokes
+    strokes = [dump_gp_stroke_range(s, None, layer, obj, True, matrix, sdic['points'])
+        for s, sdic in zip(frame.strokes, raw)]
+    count('strokes', len(strokes))
+    cache.add(frame_key, fingerprint, strokes)
+    return strokes
+
+class KeyframeIndex:
+    '''Sorted keyframe numbers of a layer, give the drawing displayed at a frame in O(log n)'''
+
+    def __init__(self, layer):
+        self.frames = sorted(layer.frames, key=lambda f: f.frame_number)
+        self.numbers = [f.frame_number for f in self.frames]
+
+    def __contains__(self, fnum):
+        '''True if there is a key exactly on this frame number'''
+        i = bisect_left(self.numbers, fnum)
+        return i < len(self.numbers) and self.numbers[i] == fnum
+
+    def active_at(self, fnum):
+        '''Return the frame displayed at given frame number (last key before or on it), None if any'''
+        i = bisect_right(self.numbers, fnum)
+        return self.frames[i-1] if i else None
+
+def action_matrix_evaluator(obj, layers):
+    '''Return a function giving object world matrix at a frame, evaluated directly from action fcurves
+    None if transform cannot be evaluated without a frame_set
+    (object parent, constraints, drivers, nla, delta transforms or parented layers)
+    '''
+    if obj.parent or len(obj.constraints) or any(l.parent for l in layers):
+        return
+    if obj.delta_location[:] != (0.0, 0.0, 0.0) or obj.delta_scale[:] != (1.0, 1.0, 1.0)\
+        or obj.delta_rotation_euler[:] != (0.0, 0.0, 0.0) or obj.delta_rotation_quaternion[:] != (1.0, 0.0, 0.0, 0.0):
+        return
 
-    for att, val in s.items():
-        if att not in ('points'):
-            setattr(ns, att, val)
-    pts_to_add = len(s['points'])
-    # print(pts_to_add, 'points')#dbg
+    anim = obj.animation_data
+    fcurves = {}
+    if anim:
+        if len(anim.drivers) or len(anim.nla_tracks):
+            return
+        if anim.action:
+            for fc in anim.action.fcurves:
+                fcurves[(fc.data_path, fc.array_index)] = fc
+
+    mode = obj.rotation_mode
+    if mode == 'QUATERNION':
+        rot_path = 'rotation_quaternion'
+    elif mode == 'AXIS_ANGLE':
+        rot_path = 'rotation_axis_angle'
+    else:
+        rot_path = 'rotation_euler'
+
+    ## static values are used on channels without fcurve
+    channels = {path: list(getattr(obj, path)) for path in ('location', rot_path, 'scale')}
+
+    def channel(path, fnum):
+        return [fcurves[(path, i)].evaluate(fnum) if (path, i) in fcurves else v
+            for i, v in enumerate(channels[path])]
+
+    def evaluate(fnum):
+        loc = Matrix.Translation(channel('location', fnum))
+        rot = channel(rot_path, fnum)
+        if mode == 'QUATERNION':
+            rot = Quaternion(rot).to_matrix().to_4x4()
+        elif mode == 'AXIS_ANGLE':
+            rot = Matrix.Rotation(rot[0], 4, Vector(rot[1:]))
+        else:
+            rot = Euler(rot, mode).to_matrix().to_4x4()
+        scale = Matrix.Diagonal(channel('scale', fnum)).to_4x4()
+        return loc @ rot @ scale
+
+    return evaluate
+
+def iter_sample_world_matrices(obj, layers, frames, track, evaluate_animation=False):
+    '''Walk the timeline only once and sample world matrix of all given layers at each frame
+    if evaluate_animation is True, object matrix is evaluated from the action without frame_set when possible
+    fill track as {layer name: {frame number: world matrix}}, yield each frame number once sampled
+    '''
+    scene = bpy.context.scene
+    for l in layers:
+        track[l.info] = {}
+
+    evaluate = action_matrix_evaluator(obj, layers) if evaluate_animation else None
+    if evaluate:
+        for i in frames:
+            mat = evaluate(i)
+            for l in layers:
+                track[l.info][i] = mat
+            yield i
+        return
 
-    ns.points.add(pts_to_add)
-    
-    ob_mat_inv = obj.matrix_world.inverted()
+    for i in frames:
+        scene.frame_set(i)
+        for l in layers:
+            track[l.info][i] = transform_cache.world(obj, l, i).copy()
+        yield i
 
-    ## patch pressure 1
-    # pressure_flat_list = [di['pressure'] for di in s['points']] #get all pressure flatened
+def sample_world_matrices(obj, layers, frames, evaluate_animation=False):
+    '''Return {layer name: {frame number: world matrix}} (see iter_sample_world_matrices)'''
+    track = {}
+    for _i in iter_sample_world_matrices(obj, layers, frames, track, evaluate_animation):
+        pass
+    return track
+
+## default values of optional point attributes (only dumped when non default)
+point_array_defaults = {
+    'vertex_color': (0.0, 0.0, 0.0, 0.0),
+    'uv_fill': (0.5, 0.5),
+    'uv_factor': 0.0,
+    'uv_rotation': 0.0,
+}
+
+def points_to_arrays(points):
+    '''Collect a list of point dics into a dic of contiguous numpy arrays (one per attribute)
+    point missing an optional key get the default value
+    return arrays dic and list of keys that cannot be set in bulk
+    '''
+    keys = set()
+    for pt in points:
+        keys.update(pt.keys())
+
+    arrays = {}
+    for att, size, dtype in point_array_attrs:
+        if att not in keys:
+            continue
+        default = point_array_defaults.get(att)
+        arrays[att] = np.array([pt.get(att, default) for pt in points], dtype=dtype)
+
+    extra_keys = [k for k in keys if k not in arrays]
+    return arrays, extra_keys
+
+def set_points_arrays(points, arrays):
+    '''Write each attribute array on a points collection with one foreach_set call
+    attributes not available in this blender version are skipped (as in get_points_arrays)
+    '''
+    for att, size, dtype in point_array_attrs:
+        values = arrays.get(att)
+        if values is None:
+            continue
+        if len(points) and not hasattr(points[0], att):
+            continue
+        points.foreach_set(att, np.ascontiguousarray(values, dtype=dtype).ravel())
+
+def add_stroke(s, frame, layer, obj, local=False):
+    '''add stroke on a given frame, (layer is for parentage setting)
+    stroke points can be a list of point dics or a dic of arrays
+    local: coordinates are already in layer space (transformed beforehand)
+    '''
+    points = s['points']
+    columnar = isinstance(points, dict)
+    pts_to_add = len(points['co']) if columnar else len(points)
+    count('points', pts_to_add)
 
-    if layer.is_parented:
-        mat = getMatrix(layer).inverted()
-        for i, pt in enumerate(s['points']):
-            for k, v in pt.items():
-                if k == 'co':
-                    setattr(ns.points[i], k, v)
-                    ns.points[i].co = ob_mat_inv @ mat @ ns.points[i].co# invert of object * invert of layer * coordinate
-                else:
-                    setattr(ns.points[i], k, v)
+    with phase('frame_create'):
+        ns = frame.strokes.new()
+
+        for att, val in s.items():
+            if att not in ('points'):
+                setattr(ns, att, val)
+
+        ns.points.add(pts_to_add)
+    
+    # invert of (object * layer)
+    mat = None if local else transform_cache.world_inverted(obj, layer)
+
+    if use_array_engine and has_array_access(ns.points):
+        if columnar:
+            arrays, extra_keys = dict(points), []
+        else:
+            arrays, extra_keys = points_to_arrays(points)
+        if 'co' in arrays and mat is not None:
+            with phase('transform'):
+                arrays['co'] = transform_coords(arrays['co'], mat)
+        with phase('point_write'):
+            set_points_arrays(ns.points, arrays)
+            # keys unknown to the bulk writer are still set point by point
+            for k in extra_keys:
+                for i, pt in enumerate(points):
+                    if k in pt:
+                        setattr(ns.points[i], k, pt[k])
     else:
-        for i, pt in enumerate(s['points']):
-            for k, v in pt.items():
-                if k == 'co':
-                    setattr(ns.points[i], k, v)
-                    ns.points[i].co = ob_mat_inv @ ns.points[i].co# invert of object * coordinate
-                else:
+        count('point_write_fallback')
+        if columnar:
+            points = arrays_to_points(points)
+        with phase('point_write'):
+            for i, pt in enumerate(points):
+                for k, v in pt.items():
                     setattr(ns.points[i], k, v)
-    
-    ## Trigger update (starting 2.93, fix drawing problem for fills and UVs)
-    ns.points.update()
+                    if k == 'co' and mat is not None:
+                        ns.points[i].co = mat @ ns.points[i].co
 
-    ## patch pressure 2
-    # ns.points.foreach_set('pressure', pressure_flat_list)
+    ## Trigger update (starting 2.93, fix drawing problem for fills and UVs)
+    with phase('geometry_update'):
+        ns.points.update()
+    return ns
+
+class PasteRecord:
+    '''Layers, frames and strokes created by a paste, to roll it back'''
+
+    def __init__(self):
+        self.layers = []
+        self.frames = []# (layer, frame)
+        self.strokes = []# (frame, stroke)
+
+    def __len__(self):
+        return len(self.strokes)
+
+    def rollback(self, gpl):
+        '''Remove everything created, strokes of created frames and layers go with them'''
+        created_layers = set(map(id, self.layers))
+        created_frames = set(id(f) for l, f in self.frames)
+        for frame, stroke in reversed(self.strokes):
+            if id(frame) not in created_frames:
+                frame.strokes.remove(stroke)
+        for layer, frame in reversed(self.frames):
+            if id(layer) not in created_layers:
+                layer.frames.remove(frame)
+        for layer in reversed(self.layers):
+            gpl.remove(layer)
+        self.__init__()
 
 def add_multiple_strokes(stroke_list, layer=None, use_current_frame=True):
     '''
@@ -363,6 +746,13 @@ def add_multiple_strokes(stroke_list, layer=None, use_current_frame=True):
     if no layer specified, active layer is used
     if use_current_frame is True, a new frame will be created only if needed
     '''
+    for _ in iter_paste_strokes(stroke_list, layer, use_current_frame):
+        pass
+
+def iter_paste_strokes(stroke_list, layer=None, use_current_frame=True, record=None):
+    '''Generator version of add_multiple_strokes, yield 1 after each added stroke (to paste by time slices)
+    record: optional PasteRecord filled with created frames and strokes
+    '''
     scene = bpy.context.scene
     obj = bpy.context.object
     gp = obj.data
@@ -385,19 +775,433 @@ def add_multiple_strokes(stroke_list, layer=None, use_current_frame=True):
         if not target_frame:
             #no active frame
             #or active exists but not aligned scene.current with use_current_frame disabled
-            target_frame = layer.frames.new(fnum)
-
-        add_stroke(s, target_frame, layer, obj)
+            with phase('frame_create'):
+                target_frame = layer.frames.new(fnum)
+            if record is not None:
+                record.frames.append((layer, target_frame))
+
+        ns = add_stroke(s, target_frame, layer, obj)
+        if record is not None:
+            record.strokes.append((target_frame, ns))
         '''
         for s in stroke_data:
             add_stroke(s, target_frame)
         '''
-    print(len(stroke_list), 'strokes pasted')
+        yield 1
+        if scene.frame_current != fnum:
+            ## timeline moved between two slices, matrices must be the ones of the paste frame
+            with phase('frame_change'):
+                scene.frame_set(fnum)
+    count('strokes', len(stroke_list))
+
+def iter_paste_layers(data, record=None):
+    '''Paste a {layer name: {frame: stroke list}} dic, yield 0 after each added stroke and 1 after each frame
+    layers are created if needed, scene go to each frame to use its matrices
+    the whole dic is decoded before paste (json or history slot)
+    '''
+    scene = bpy.context.scene
+    gpl = bpy.context.object.data.layers
+    peak('decoded_bytes', payload_size(data))
+    for layname, allframes in data.items():
+        layer = gpl.get(layname)
+        if not layer:
+            with phase('frame_create'):
+                layer = gpl.new(layname)
+            if record is not None:
+                record.layers.append(layer)
+        for fnum, fstrokes in allframes.items():
+            with phase('frame_change'):
+                scene.frame_set(int(fnum))#use matrix of this frame for copying (maybe just evaluate depsgraph for object
+            for _ in iter_paste_strokes(fstrokes, layer=layer, use_current_frame=False, record=record):#create a new frame at each encoutered
+                yield 0
+            yield 1
+
+def iter_paste_container(container, record=None, executor=None, layers=None, frame_range=None):
+    '''Paste a binary layers container, yield 0 after each sampled frame and added stroke and 1 after each frame
+    layers, frame_range: optional selection, only blocks of selected frames are decoded
+    matrices of target layers are sampled in one timeline pass, then frames are decompressed,
+    decoded and transformed to layer space by the executor workers ahead of the main thread
+    which only create frames and strokes
+    '''
+    obj = bpy.context.object
+    gpl = obj.data.layers
+    meta, _start = clipformat.read_meta(container)
+    index = clipformat.select_frames(meta['data'], layers, frame_range)
+
+    layers = {}
+    for layname in index:
+        layer = gpl.get(layname)
+        if not layer:
+            with phase('frame_create'):
+                layer = gpl.new(layname)
+            if record is not None:
+                record.layers.append(layer)
+        layers[layname] = layer
+
+    frames = sorted({int(fnum) for allframes in index.values() for fnum in allframes})
+    world = {}
+    sampling = iter_sample_world_matrices(obj, list(layers.values()), frames, world)
+    while True:
+        with phase('sample'):
+            sampled = next(sampling, None)
+        if sampled is None:
+            break
+        yield 0
+    ## invert of (object * layer) at each pasted frame
+    inverse = {layname: {int(fnum): matrix_to_array(world[layname][int(fnum)].inverted()) for fnum in allframes}
+        for layname, allframes in index.items()}
+
+    existing = {layname: {f.frame_number: f for f in layer.frames} for layname, layer in layers.items()}
+    decoded = clipformat.iter_layer_frames(container, inverse, executor,
+        ahead=get_addon_prefs().decode_ahead, layers=index, frame_range=frame_range,
+        memory=functools.partial(peak, 'decoded_bytes'))
+    while True:
+        with phase('decode'):
+            item = next(decoded, None)
+        if item is None:
+            break
+        layname, fnum, strokes = item
+        layer = layers[layname]
+        frame = existing[layname].get(fnum)
+        if frame is None:
+            with phase('frame_create'):
+                frame = existing[layname][fnum] = layer.frames.new(fnum)
+            if record is not None:
+                record.frames.append((layer, frame))
+        for s in strokes:
+            ns = add_stroke(s, frame, layer, obj, local=True)
+            if record is not None:
+                record.strokes.append((frame, ns))
+            yield 0
+        count('strokes', len(strokes))
+        ## release the frame before the next one is decoded
+        item = strokes = None
+        yield 1
+
+
+def use_binary_payload():
+    '''Return True if copy should use the compact binary payload (set in addon preferences)'''
+    return get_addon_prefs().clipboard_format != 'JSON'
+
+def use_shared_memory():
+    '''Return True if copy should go through shared memory (set in addon preferences)'''
+    if get_addon_prefs().clipboard_format != 'SHARED_MEMORY':
+        return False
+    return clipshm.available
+
+def transport_message():
+    '''Note appended to copy reports when the chosen transport fell back to the clipboard'''
+    if get_addon_prefs().clipboard_format == 'SHARED_MEMORY' and not clipshm.available:
+        return ' - shared memory need python 3.8+, copied to clipboard'
+    return ''
+
+def payload_settings(binary):
+    '''Encoding options from addon preferences (read on main thread, passed to encode_payload)'''
+    prefs = get_addon_prefs()
+    shared = binary and use_shared_memory()
+    reduced = binary and prefs.precision == 'REDUCED'
+    if binary and not shared and prefs.spill_size:
+        configure_store()
+    encoded_cache.set_budget(prefs.encoded_cache_size * 2**20)
+    return {
+        'binary': binary,
+        'shared': shared,
+        'bits': prefs.coordinate_bits if reduced else 0,
+        'half': reduced,
+        'spill': prefs.spill_size * 2**20 if binary and not shared else 0,
+        'cache': encoded_cache if binary and prefs.encoded_cache_size else None,
+    }
+
+def encode_payload(data, tracks, settings, executor=None):
+    '''Encode copied data, no bpy access so it can run in a worker thread
+    return (payload, errors): payload is the clipboard text, or container bytes
+    to publish in shared memory; errors the max error of reduced precision attributes
+    '''
+    errors = {}
+    if not settings['binary']:
+        with phase('encode'):
+            text = json.dumps(data)
+        count('payload_bytes', len(text))
+        return text, errors
+
+    shared = settings['shared']
+    cache = settings.get('cache')
+    hits = cache.hits if cache else 0
+    with phase('encode'):
+        container = clipformat.encode_container(data, tracks, compress=not shared,
+            bits=settings['bits'], half=settings['half'], errors=errors,
+            delta=not shared,# shared memory arrays are kept as is to be used in place
+            executor=executor, cache=cache)
+    if cache:
+        count('reused_blocks', cache.hits - hits)
+    count('payload_bytes', len(container))
+    if shared:
+        return container, errors
+
+    if settings['spill'] and len(container) > settings['spill']:
+        ## too big for the OS clipboard: written in cache, only a token is copied
+        with phase('spill'):
+            return clipstore.store(container), errors
+    with phase('encode'):
+        return clipformat.wrap(container), errors
+
+def publish_payload(payload):
+    '''Put an encoded payload on the clipboard (main thread only)'''
+    if isinstance(payload, bytes):
+        ## arrays are left uncompressed in a shared block, only its descriptor is copied
+        with phase('shared_write'):
+            payload = clipshm.publish(payload)
+    with phase('clipboard_write'):
+        bpy.context.window_manager.clipboard = payload
+
+def write_clipboard(data, binary=True, tracks=None, background=False, message='Copied', settings=None):
+    '''Encode data (stroke list or layers dic) to the clipboard
+    tracks: optional per layer frame matrices of layers dumped in layer space (binary only)
+    background: encode in a worker thread, the clipboard is written by a timer when done
+    (message is the report of the finished copy)
+    settings: payload_settings already used for extraction (read from preferences by default)
+    return max error of each attribute stored with reduced precision (empty dic if lossless),
+    None when encoding in background
+    '''
+    add_history_slot(data, tracks, message)
+    if settings is None:
+        settings = payload_settings(binary)
+    if background:
+        start_background_copy(data, tracks, settings, message)
+        return None
+    payload, errors = encode_payload(data, tracks, settings, executor=get_worker_pool())
+    publish_payload(payload)
+    return errors
+
+def configure_history():
+    prefs = get_addon_prefs()
+    history.configure(prefs.history_size * 2**20, prefs.history_slots)
+
+def add_history_slot(data, tracks, message):
+    '''Keep copied data (extracted arrays) in the session clipboard history'''
+    configure_history()
+    if isinstance(data, dict):
+        frames = sum(len(allframes) for allframes in data.values())
+        name = f'{message}: {len(data)} layers, {frames} frames'
+    else:
+        name = f'{message}: {len(data)} strokes'
+    obj = bpy.context.object
+    if obj:
+        name = f'{obj.name} - {name}'
+    history.add(name, data, tracks)
+
+### --- background copy
+
+copy_pool = None# one encoding job at a time, a newer copy replace the pending one
+worker_pool = None# layers encoded and frames decoded in parallel
+pending_copy = None
+background_status = ''
+
+def get_worker_pool():
+    global worker_pool
+    if worker_pool is None:
+        worker_pool = ThreadPoolExecutor(max_workers=min(8, os.cpu_count() or 1), thread_name_prefix='gpclip_worker')
+    return worker_pool
+
+def encode_job(data, tracks, settings, name, executor):
+    '''Return (payload, errors, trace), the trace is recorded by the main thread'''
+    with tracer.operation(name, record=False) as trace:
+        payload, errors = encode_payload(data, tracks, settings, executor)
+    return payload, errors, trace
+
+def start_background_copy(data, tracks, settings, message):
+    '''Submit encoding of extracted data (independent arrays, no bpy data) to a worker thread'''
+    global copy_pool, pending_copy, background_status
+    if copy_pool is None:
+        copy_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='gpclip_copy')
+    if pending_copy:
+        pending_copy['future'].cancel()# result of a running one is dropped in any case
+    name = tracer.current.name + '_encode' if tracer.current else 'encode'
+    pending_copy = {
+        'future': copy_pool.submit(encode_job, data, tracks, settings, name, get_worker_pool()),
+        'message': message,
+        't0': time(),
+    }
+    background_status = f'{message}: encoding...'
+    if not bpy.app.timers.is_registered(check_background_copy):
+        bpy.app.timers.register(check_background_copy, first_interval=0.05)
+
+def finish_background_copy():
+    '''Write the pending encoded payload to the clipboard (wait for it if needed)'''
+    global pending_copy, background_status
+    job, pending_copy = pending_copy, None
+    try:
+        payload, errors, trace = job['future'].result()
+        tracer.record(trace)
+        publish_payload(payload)
+    except Exception as e:
+        background_status = f'{job["message"]}: encoding failed ({e})'
+    else:
+        background_status = f'{job["message"]} (encoded in background : {time() - job["t0"]:.4f}){precision_message(errors)}{transport_message()}'
+    for window in bpy.context.window_manager.windows:
+        for area in window.screen.areas:
+            if area.type == 'VIEW_3D':
+                area.tag_redraw()
+
+def check_background_copy():
+    '''Timer polling the pending copy'''
+    if pending_copy is None:
+        return None
+    if not pending_copy['future'].done():
+        return 0.05
+    finish_background_copy()
+    return None
+
+def wait_background_copy():
+    '''Make sure the clipboard hold the last copy before reading it'''
+    if pending_copy is not None:
+        finish_background_copy()
+
+def stop_background_copy():
+    global copy_pool, worker_pool, pending_copy
+    if bpy.app.timers.is_registered(check_background_copy):
+        bpy.app.timers.unregister(check_background_copy)
+    pending_copy = None
+    for pool in (copy_pool, worker_pool):
+        if pool:
+            pool.shutdown(wait=False)
+    copy_pool = worker_pool = None
+
+def copy_report(message, t0, errors):
+    '''Operator report of a copy, errors is None when encoding in background'''
+    if errors is None:
+        return f'{message}, encoding in background (time : {time() - t0:.4f}){transport_message()}'
+    return f'{message} (time : {time() - t0:.4f}){precision_message(errors)}{transport_message()}'
+
+def precision_message(errors):
+    '''Max error of reduced precision attributes to append to operator report'''
+    if not errors:
+        return ''
+    co = errors.get('co')
+    attrs = max((v for k, v in errors.items() if k != 'co'), default=None)
+    mess = []
+    if co is not None:
+        mess.append(f'coordinates {co:.2g}')
+    if attrs is not None:
+        mess.append(f'attributes {attrs:.2g}')
+    return ', max error: ' + ' / '.join(mess)
+
+def memory_message():
+    '''Peak of decoded data alive during the running operation to append to operator report'''
+    trace = tracer.current
+    if trace is None or 'decoded_bytes' not in trace.peaks:
+        return ''
+    return f', peak decoded {trace.peaks["decoded_bytes"] / 2**20:.1f} MB'
+
+def read_clipboard_text():
+    wait_background_copy()
+    with phase('clipboard_read'):
+        return bpy.context.window_manager.clipboard
+
+def read_container(text=None):
+    '''Return (binary container, clipboard text), container is None for legacy json payload
+    it can be bytes, a shared memory buffer or a memory mapped file (see close_container)
+    '''
+    if text is None:
+        text = read_clipboard_text()
+    if clipshm.is_token(text):
+        return clipshm.attach(text), text
+    if clipstore.is_token(text):
+        configure_store()
+        return clipstore.open_mapped(text), text
+    count('payload_bytes', len(text))
+    if clipformat.is_payload(text):
+        with phase('decode'):
+            return clipformat.unwrap(text), text
+    return None, text
+
+def close_container(container):
+    if isinstance(container, mmap.mmap):
+        container.close()
+
+class PayloadTypeError(ValueError):
+    '''Clipboard hold another kind of payload (strokes / layers) than the one expected'''
+
+def check_payload_type(kind, found):
+    if kind and found != kind:
+        raise PayloadTypeError(f'Clipboard contains {found}, use paste {found} instead')
+
+def read_clipboard(kind=None):
+    '''Decode clipboard content, binary payload or legacy json are auto-detected
+    decoded payloads are kept in memory by content hash: pasting again the same clipboard skip decoding
+    kind: expected payload ('strokes' or 'layers'), PayloadTypeError is raised otherwise
+    (binary payload type is checked before decoding)
+    '''
+    text = read_clipboard_text()
+    key = None
+    budget = get_addon_prefs().decoded_cache_size * 2**20
+    decoded_cache.set_budget(budget)
+    ## shared memory payloads are already decoded in place
+    if budget and not clipshm.is_token(text):
+        with phase('cache_lookup'):
+            key = content_key(text)
+            data = decoded_cache.get(key)
+        if data is not None:
+            count('decoded_cache_hit')
+            check_payload_type(kind, 'layers' if isinstance(data, dict) else 'strokes')
+            return data
+
+    container, text = read_container(text)
+    with phase('decode'):
+        if container is None:
+            data = json.loads(text)
+            check_payload_type(kind, 'layers' if isinstance(data, dict) else 'strokes')
+        else:
+            try:
+                check_payload_type(kind, clipformat.read_meta(container)[0]['type'])
+                data = clipformat.decode_container(container)
+            finally:
+                close_container(container)
+    if key:
+        decoded_cache.put(key, data)
+    return data
+
+def configure_store():
+    '''Apply disk cache settings of the addon preferences'''
+    prefs = get_addon_prefs()
+    clipstore.directory = bpy.path.abspath(prefs.cache_directory) if prefs.cache_directory else ''
+    clipstore.budget = prefs.cache_budget * 2**20
+
+def configure_tracer():
+    '''Apply timing settings of the addon preferences'''
+    prefs = get_addon_prefs()
+    tracer.set_history_size(prefs.trace_history)
+    tracer.trace_file = bpy.path.abspath(prefs.trace_file) if prefs.trace_file else ''
+    if prefs.profile_next:
+        prefs.profile_next = False
+        tracer.profile_next = True
+
+def traced_operation(name):
+    '''Decorator recording per phase timing of an operator execute'''
+    def decorator(execute):
+        @functools.wraps(execute)
+        def wrapper(self, context):
+            configure_tracer()
+            with tracer.operation(name):
+                return execute(self, context)
+        return wrapper
+    return decorator
 
 
 ### OPERATORS
 
-class GPCLIP_OT_copy_strokes(bpy.types.Operator):
+class BackgroundCopy:
+    '''Copy operators encode in a worker thread when run from UI (invoke) and background_encode is enabled,
+    execute stay synchronous for scripts
+    '''
+
+    background = False
+
+    def invoke(self, context, event):
+        self.background = get_addon_prefs().background_encode
+        return self.execute(context)
+
+class GPCLIP_OT_copy_strokes(BackgroundCopy, bpy.types.Operator):
     bl_idname = "gp.copy_strokes"
     bl_label = "GP Copy strokes"
     bl_description = "Copy strokes to str in paperclip"
@@ -408,6 +1212,7 @@ class GPCLIP_OT_copy_strokes(bpy.types.Operator):
     def poll(cls, context):
         return context.object and context.object.type == 'GPENCIL'
 
+    @traced_operation('copy')
     def execute(self, context):
         # if not context.object or not context.object.type == 'GPENCIL':
         #     self.report({'ERROR'},'No GP object selected')
@@ -415,19 +1220,21 @@ class GPCLIP_OT_copy_strokes(bpy.types.Operator):
 
         t0 = time()
         #ct = check_pressure()
-        strokelist = copycut_strokes(copy=True, keep_empty=True)
+        binary = use_binary_payload()
+        with phase('collect'):
+            strokelist = copycut_strokes(copy=True, keep_empty=True, as_arrays=binary)
         if not strokelist:
             self.report({'ERROR'},'rien a copier')
             return {"CANCELLED"}
-        bpy.context.window_manager.clipboard = json.dumps(strokelist)#copy=self.copy
+        errors = write_clipboard(strokelist, binary, background=self.background, message='Copied')#copy=self.copy
         #if ct:
         #    self.report({'ERROR'}, "Copie OK\n{} points ont une épaisseur supérieure a 1.0 (max = {:.2f})\nCes épaisseurs seront plafonnées à 1 au 'coller'".format(ct[0], ct[1]))
-        self.report({'INFO'}, f'Copied (time : {time() - t0:.4f})')
+        self.report({'INFO'}, copy_report('Copied', t0, errors))
         # print('copy total time:', time() - t0)
         return {"FINISHED"}
 
 
-class GPCLIP_OT_cut_strokes(bpy.types.Operator):
+class GPCLIP_OT_cut_strokes(BackgroundCopy, bpy.types.Operator):
     bl_idname = "gp.cut_strokes"
     bl_label = "GP Cut strokes"
     bl_description = "Cut strokes to str in paperclip"
@@ -437,64 +1244,216 @@ class GPCLIP_OT_cut_strokes(bpy.types.Operator):
     def poll(cls, context):
         return context.object and context.object.type == 'GPENCIL'
 
+    @traced_operation('cut')
     def execute(self, context):
         # if not context.object or not context.object.type == 'GPENCIL':
         #     self.report({'ERROR'},'No GP object selected')
         #     return {"CANCELLED"}
 
         t0 = time()
-        strokelist = copycut_strokes(copy=False, keep_empty=True)#ct = check_pressure()
+        binary = use_binary_payload()
+        with phase('collect'):
+            strokelist = copycut_strokes(copy=False, keep_empty=True, as_arrays=binary)#ct = check_pressure()
         if not strokelist:
             self.report({'ERROR'},'Nothing to cut')
             return {"CANCELLED"}
-        bpy.context.window_manager.clipboard = json.dumps(strokelist)
+        errors = write_clipboard(strokelist, binary, background=self.background, message='Cutted')
         
-        self.report({'INFO'}, f'Cutted (time : {time() - t0:.4f})')
+        self.report({'INFO'}, copy_report('Cutted', t0, errors))
         return {"FINISHED"}
 
-class GPCLIP_OT_paste_strokes(bpy.types.Operator):
+class PasteModal:
+    '''Time sliced paste shared by paste operators (invoke), execute stay synchronous for scripts
+    the clipboard is decoded once then pasted by slices on timer events, with progress
+    in the status bar, Esc or right click cancel and remove what was already pasted
+    subclasses define trace_name, done_message, unit, steps_count(data) and paste_steps(context, data, record)
+    (paste_steps yield the progress done by each step, in unit)
+    '''
+
+    payload_type = None# expected kind of payload ('strokes' or 'layers')
+
+    ## view navigation stay usable while pasting, other events (edits, undo...) are consumed
+    ## since they would change the data under the running paste
+    pass_through_events = {'MOUSEMOVE', 'INBETWEEN_MOUSEMOVE', 'MIDDLEMOUSE',
+        'WHEELUPMOUSE', 'WHEELDOWNMOUSE', 'WHEELINMOUSE', 'WHEELOUTMOUSE',
+        'TRACKPADPAN', 'TRACKPADZOOM', 'MOUSEROTATE', 'MOUSESMARTZOOM', 'NDOF_MOTION',
+        'NUMPAD_0', 'NUMPAD_1', 'NUMPAD_2', 'NUMPAD_3', 'NUMPAD_4', 'NUMPAD_5', 'NUMPAD_6',
+        'NUMPAD_7', 'NUMPAD_8', 'NUMPAD_9', 'NUMPAD_PERIOD', 'NUMPAD_PLUS', 'NUMPAD_MINUS',
+        'WINDOW_DEACTIVATE'}
+
+    def load_clipboard(self):
+        '''Decode the clipboard, report and return None on failure'''
+        #add a validity check por the content of the paperclip (check if not data.startswith('[{') ? )
+        try:
+            return read_clipboard(self.payload_type)
+        except (FileNotFoundError, PayloadTypeError) as e:
+            self.report({'ERROR'}, str(e))
+        except:
+            mess = 'Clipboard does not contain drawing data (load error)'
+            self.report({'ERROR'}, mess)
+        return None
+
+    def invoke(self, context, event):
+        return self.start_paste(context)
+
+    def start_paste(self, context):
+        '''Load the clipboard and paste the first slice, go modal if there is more to paste'''
+        configure_tracer()
+        self._trace = ExitStack()
+        self._trace.enter_context(tracer.operation(self.trace_name))
+        self._timer = None
+        self.t0 = time()
+        self.org_frame = context.scene.frame_current
+        self.slice_time = get_addon_prefs().paste_slice / 1000
+
+        self.data = data = self.load_clipboard()
+        if data is None:
+            self._trace.close()
+            return {"CANCELLED"}
+
+        self.total = self.steps_count(data)
+        self.done = 0
+        self.record = PasteRecord()
+        self.steps = self.paste_steps(context, data, self.record)
+
+        ## small paste end in the first slice, no modal needed
+        if self.safe_slice(context):
+            return self.finish(context)
+
+        wm = context.window_manager
+        self._timer = wm.event_timer_add(0.01, window=context.window)
+        wm.progress_begin(0, self.total)
+        wm.modal_handler_add(self)
+        self.update_status(context)
+        return {"RUNNING_MODAL"}
+
+    def modal(self, context, event):
+        if event.type in {'ESC', 'RIGHTMOUSE'}:
+            return self.cancel_paste(context)
+        if event.type in self.pass_through_events:
+            return {"PASS_THROUGH"}
+        if event.type != 'TIMER':
+            return {"RUNNING_MODAL"}
+
+        if self.safe_slice(context):
+            return self.finish(context)
+        self.update_status(context)
+        return {"RUNNING_MODAL"}
+
+    def cancel(self, context):
+        self.cancel_paste(context)
+
+    def run_slice(self):
+        '''Paste until the slice time is elapsed, return True when everything is pasted'''
+        end = perf_counter() + self.slice_time
+        for step in self.steps:
+            self.done += step
+            if perf_counter() > end:
+                return False
+        return True
+
+    def safe_slice(self, context):
+        '''run_slice, on error remove what was already pasted and end the modal before raising'''
+        try:
+            return self.run_slice()
+        except Exception:
+            self.cancel_paste(context)
+            raise
+
+    def update_status(self, context):
+        context.window_manager.progress_update(self.done)
+        context.workspace.status_text_set(f'Pasting {self.unit} {self.done}/{self.total} - Esc to cancel')
+
+    def end_modal(self, context):
+        if self._timer:
+            wm = context.window_manager
+            wm.event_timer_remove(self._timer)
+            wm.progress_end()
+            context.workspace.status_text_set(None)
+            self._timer = None
+        if context.scene.frame_current != self.org_frame:
+            context.scene.frame_set(self.org_frame)
+        self.steps.close()
+        self.release_data(self.data)
+        self._trace.close()
+
+    def finish(self, context):
+        memory = memory_message()
+        self.end_modal(context)
+        self.report({'INFO'}, f'{self.done_message} (time : {time() - self.t0:.4f}{memory})')
+        return {"FINISHED"}
+
+    def release_data(self, data):
+        pass
+
+    def cancel_paste(self, context):
+        self.steps.close()
+        removed = len(self.record)
+        self.record.rollback(context.object.data.layers)
+        self.end_modal(context)
+        self.report({'WARNING'}, f'Paste cancelled, {removed} pasted strokes removed')
+        return {"CANCELLED"}
+
+class GPCLIP_OT_paste_strokes(PasteModal, bpy.types.Operator):
     bl_idname = "gp.paste_strokes"
     bl_label = "GP Paste strokes"
     bl_description = "paste stroke from paperclip"
     bl_options = {"REGISTER"}
 
+    trace_name = 'paste'
+    done_message = 'Pasted'
+    unit = 'strokes'
+    payload_type = 'strokes'
+
     @classmethod
     def poll(cls, context):
         return context.object and context.object.type == 'GPENCIL'
 
+    def steps_count(self, data):
+        return len(data)
+
+    def paste_steps(self, context, data, record):
+        return iter_paste_strokes(data, use_current_frame=True, record=record)
+
+    @traced_operation('paste')
     def execute(self, context):
         # if not context.object or not context.object.type == 'GPENCIL':
         #     self.report({'ERROR'},'No GP object selected to paste on')
         #     return {"CANCELLED"}
         
         t0 = time()
-        #add a validity check por the content of the paperclip (check if not data.startswith('[{') ? )
-        try:
-            data = json.loads(bpy.context.window_manager.clipboard)
-        except:
-            mess = 'Clipboard does not contain drawing data (load error)'
-            self.report({'ERROR'}, mess)
+        data = self.load_clipboard()
+        if data is None:
             return {"CANCELLED"}
 
-        print('data loaded', time() - t0)
         add_multiple_strokes(data, use_current_frame=True)
-        print('total_time', time() - t0)
 
+        self.report({'INFO'}, f'Pasted (time : {time() - t0:.4f})')
         return {"FINISHED"}
 
 ### --- multi copy
 
-class GPCLIP_OT_copy_multi_strokes(bpy.types.Operator):
+class GPCLIP_OT_copy_multi_strokes(BackgroundCopy, bpy.types.Operator):
     bl_idname = "gp.copy_multi_strokes"
     bl_label = "GP Copy multi strokes"
     bl_description = "Copy multiple layers>frames>strokes (unlocked and unhided ones) to str in paperclip"
     bl_options = {"REGISTER"}
 
-    #copy = bpy.props.BoolProperty(default=True)
+    evaluate_animation : bpy.props.BoolProperty(name='Evaluate Animation',
+        description='Evaluate object transform directly from its animation curves instead of changing frame\
+            \n(frame by frame evaluation is still used if object has parent, constraints, drivers or parented layers)',
+        default=False)
+
+    use_transform_track : bpy.props.BoolProperty(name='Transform Track',
+        description='Store each drawing once in layer space with a matrix per frame instead of baking world coordinates on every frame\
+            \n(much smaller payload for animated objects, binary clipboard format only)',
+        default=False)
+
     @classmethod
     def poll(cls, context):
         return context.object and context.object.type == 'GPENCIL'
 
+    @traced_operation('copy_layers')
     def execute(self, context):
         bake_moves = True
         skip_empty_frame = False
@@ -505,23 +1464,51 @@ class GPCLIP_OT_copy_multi_strokes(bpy.types.Operator):
         t0 = time()
         #ct = check_pressure()
         layerdic = {}
+        binary = use_binary_payload()
 
         layerpool = [l for l in gpl if not l.hide and l.select]# and not l.lock
         if not layerpool:
             self.report({'ERROR'}, 'No layers selected in GP dopesheet (needs to be visible and selected to be copied)\nHint: Changing active layer reset selection to active only')
             return {"CANCELLED"}
             
+        scene = context.scene
+        layerpool = [l for l in layerpool if l.frames]# skip empty layers
+        if bake_moves:
+            frames = range(scene.frame_start, scene.frame_end)
+        else:
+            frames = sorted({f.frame_number for l in layerpool for f in l.frames})
+
+        ## single timeline pass for all layers, then serialize from the sampled matrix track
+        with phase('sample'):
+            track = sample_world_matrices(obj, layerpool, frames, evaluate_animation=self.evaluate_animation)
+
+        use_track = binary and self.use_transform_track
+        tracks = {} if use_track else None
+        local_drawings = {}
+        identity = Matrix.Identity(4)
+        settings = payload_settings(binary)
+
+        def dump_frame(l, f, fnum, mat):
+            with phase('collect'):
+                if not use_track:
+                    if not binary:
+                        return copy_all_strokes_in_frame(frame=f, layers=l, obj=obj, as_arrays=False, matrix=mat)
+                    return copy_frame_cached(f, l, obj, mat, settings, (obj.name, l.info, fnum))
+                ## drawing dumped once per key in layer space, world matrix of the frame go in layer track
+                tracks.setdefault(l.info, {})[fnum] = matrix_to_array(mat)
+                key = (l.info, f.frame_number)
+                if key not in local_drawings:
+                    local_drawings[key] = copy_frame_cached(f, l, obj, identity, settings, (obj.name,) + key)
+                return local_drawings[key]
+
         if not bake_moves:# copy only drawed frames as is.
             for l in layerpool:
-                if not l.frames:
-                    continue# skip empty layers
-
                 frame_dic = {}
                 for f in l.frames:
                     if skip_empty_frame and not len(f.strokes):
                         continue
-                    context.scene.frame_set(f.frame_number)#use matrix of this frame
-                    strokelist = copy_all_strokes_in_frame(frame=f, layers=l, obj=obj)
+                    mat = track[l.info][f.frame_number]#use matrix of this frame
+                    strokelist = dump_frame(l, f, f.frame_number, mat)
                     
                     frame_dic[f.frame_number] = strokelist
                 
@@ -529,72 +1516,102 @@ class GPCLIP_OT_copy_multi_strokes(bpy.types.Operator):
 
         else:# bake position: copy frame where object as moved even if frame is unchanged 
             for l in layerpool:
-                if not l.frames:
-                    continue# skip empty layers
-                
                 frame_dic = {}
 
-                fnums_dic = {f.frame_number: f for f in l.frames}
-
-                context.scene.frame_set(context.scene.frame_start)
-                curmat = prevmat = obj.matrix_world.copy()
+                keys = KeyframeIndex(l)
+                prevmat = None
 
-                for i in range(context.scene.frame_start, context.scene.frame_end):
-                    context.scene.frame_set(i)#use matrix of this frame
-                    curmat = obj.matrix_world.copy()
+                for i, curmat in track[l.info].items():
+                    if prevmat is None:
+                        prevmat = curmat
 
                     # if object has moved or current time is on a draw key
-                    if prevmat != curmat or i in fnums_dic.keys():
-                        # get the current used frame
-                        for j in fnums_dic.keys():
-                            if j >= i:
-                                f = fnums_dic[j]
-                                break
-                        
+                    if prevmat != curmat or i in keys:
+                        # get the drawing displayed at this time (None before first key)
+                        f = keys.active_at(i)
+
                         ## skip empty frame if specified
-                        if skip_empty_frame and not len(f.strokes):
-                            continue
-                        
-                        strokelist = copy_all_strokes_in_frame(frame=f, layers=l, obj=obj)
-                        frame_dic[i] = strokelist
+                        if f and not (skip_empty_frame and not len(f.strokes)):
+                            strokelist = dump_frame(l, f, i, curmat)
+                            frame_dic[i] = strokelist
 
                     prevmat = curmat    
                 layerdic[l.info] = frame_dic                
 
         ## All to clipboard manager
-        bpy.context.window_manager.clipboard = json.dumps(layerdic)
+        errors = write_clipboard(layerdic, binary, tracks, background=self.background, message='Copied layers', settings=settings)
 
         # reset original frame.
-        context.scene.frame_set(org_frame)
-        self.report({'INFO'}, f'Copied layers (time : {time() - t0:.4f})')
+        with phase('frame_change'):
+            context.scene.frame_set(org_frame)
+        self.report({'INFO'}, copy_report('Copied layers', t0, errors))
         # print('copy total time:', time() - t0)
         return {"FINISHED"}
 
-class GPCLIP_OT_paste_multi_strokes(bpy.types.Operator):
+class GPCLIP_OT_paste_multi_strokes(PasteModal, bpy.types.Operator):
     bl_idname = "gp.paste_multi_strokes"
     bl_label = "GP paste multi strokes"
     bl_description = "Paste multiple layers>frames>strokes from paperclip"
     bl_options = {"REGISTER"}
 
+    trace_name = 'paste_layers'
+    done_message = 'Pasted layers'
+    unit = 'frames'
+
     #copy = bpy.props.BoolProperty(default=True)
     @classmethod
     def poll(cls, context):
         return context.object and context.object.type == 'GPENCIL'
 
-    def execute(self, context):
-        org_frame = context.scene.frame_current
-        obj = context.object
-        gpl = obj.data.layers
-        t0 = time()
-        #add a validity check por the content of the paperclip (check if not data.startswith('[{') ? )
+    def load_clipboard(self):
+        '''Binary payload is returned undecoded (container), decoded by workers while pasting'''
         try:
-            data = json.loads(bpy.context.window_manager.clipboard)
+            container, text = read_container()
+            if container is None:
+                data = json.loads(text)
+                check_payload_type('layers', 'layers' if isinstance(data, dict) else 'strokes')
+                return data
+            try:
+                check_payload_type('layers', clipformat.read_meta(container)[0]['type'])
+            except:
+                close_container(container)
+                raise
+            return container
+        except (FileNotFoundError, PayloadTypeError) as e:
+            self.report({'ERROR'}, str(e))
         except:
             mess = 'Clipboard does not contain drawing data (load error)'
             self.report({'ERROR'}, mess)
+        return None
+
+    def release_data(self, data):
+        close_container(data)
+
+    def selection(self):
+        '''Return (layer names or None, frame range or None) to paste, everything by default'''
+        return None, None
+
+    def steps_count(self, data):
+        if not isinstance(data, dict):
+            data = clipformat.read_meta(data)[0]['data']
+        return sum(len(allframes) for allframes in clipformat.select_frames(data, *self.selection()).values())
+
+    def paste_steps(self, context, data, record):
+        layers, frame_range = self.selection()
+        if isinstance(data, dict):
+            if layers is not None or frame_range is not None:
+                data = clipformat.select_frames(data, layers, frame_range)
+            return iter_paste_layers(data, record)
+        return iter_paste_container(data, record, executor=get_worker_pool(), layers=layers, frame_range=frame_range)
+
+    def paste_now(self, context):
+        '''Synchronous paste of the selection (execute), report done_message'''
+        org_frame = context.scene.frame_current
+        t0 = time()
+        data = self.load_clipboard()
+        if data is None:
             return {"CANCELLED"}
 
-        print('data loaded', time() - t0)
         # add layers (or merge with existing names ?)
         
         ### structure
@@ -602,22 +1619,146 @@ class GPCLIP_OT_paste_multi_strokes(bpy.types.Operator):
         #       {1: [strokelist of frame 1], 3: [strokelist of frame 3]}
         # }
 
-        for layname, allframes in data.items():
-            layer = gpl.get(layname)
-            if not layer:
-                layer = gpl.new(layname)
-            for fnum, fstrokes in allframes.items():
-                context.scene.frame_set(int(fnum))#use matrix of this frame for copying (maybe just evaluate depsgraph for object
-                add_multiple_strokes(fstrokes, use_current_frame=False)#create a new frame at each encoutered 
-        
-        print('total_time', time() - t0)
+        try:
+            for _ in self.paste_steps(context, data, None):
+                pass
+        finally:
+            self.release_data(data)
 
         # reset original frame.
-        context.scene.frame_set(org_frame)
-        self.report({'INFO'}, f'Copied layers (time : {time() - t0:.4f})')
+        with phase('frame_change'):
+            context.scene.frame_set(org_frame)
+        self.report({'INFO'}, f'{self.done_message} (time : {time() - t0:.4f}{memory_message()})')
         # print('copy total time:', time() - t0)
         return {"FINISHED"}
 
+    @traced_operation('paste_layers')
+    def execute(self, context):
+        return self.paste_now(context)
+
+class GPCLIP_OT_paste_selected_strokes(GPCLIP_OT_paste_multi_strokes):
+    bl_idname = "gp.paste_selected_strokes"
+    bl_label = "GP paste selected layers"
+    bl_description = "Paste only some layers and a frame range of multiple layers>frames>strokes from paperclip\nonly the selected frames are decoded"
+    bl_options = {"REGISTER"}
+
+    layers : bpy.props.StringProperty(name='Layers',
+        description="Names of the layers to paste separated by comma, empty to paste all layers", default='')
+
+    use_frame_range : bpy.props.BoolProperty(name='Frame Range',
+        description="Paste only the frames in range", default=False)
+
+    frame_start : bpy.props.IntProperty(name='Start', default=1)
+    frame_end : bpy.props.IntProperty(name='End', default=250)
+
+    trace_name = 'paste_selected'
+    done_message = 'Pasted selected layers'
+    dialog = False
+
+    def selection(self):
+        '''Return (layer names or None, frame range or None)'''
+        layers = [name.strip() for name in self.layers.split(',') if name.strip()] or None
+        frame_range = (self.frame_start, self.frame_end) if self.use_frame_range else None
+        return layers, frame_range
+
+    def invoke(self, context, event):
+        ## list clipboard layers in the dialog (only the container meta is read)
+        self.available = []
+        try:
+            container, _text = read_container()
+            if container is not None:
+                self.available = list(clipformat.read_meta(container)[0]['data'])
+                close_container(container)
+        except Exception:
+            pass
+        if not self.use_frame_range:
+            self.frame_start = context.scene.frame_start
+            self.frame_end = context.scene.frame_end
+        self.dialog = True
+        return context.window_manager.invoke_props_dialog(self)
+
+    def draw(self, context):
+        layout = self.layout
+        if getattr(self, 'available', None):
+            layout.label(text='In clipboard: ' + ', '.join(self.available))
+        layout.prop(self, 'layers')
+        layout.prop(self, 'use_frame_range')
+        row = layout.row(align=True)
+        row.active = self.use_frame_range
+        row.prop(self, 'frame_start')
+        row.prop(self, 'frame_end')
+
+    def execute(self, context):
+        if self.dialog:
+            ## confirmed from the invoke dialog: time sliced paste (traced by start_paste) like other interactive pastes
+            self.dialog = False
+            return self.start_paste(context)
+        configure_tracer()
+        with tracer.operation(self.trace_name):
+            return self.paste_now(context)
+
+class GPCLIP_OT_paste_slot(PasteModal, bpy.types.Operator):
+    bl_idname = "gp.paste_slot"
+    bl_label = "GP Paste from history"
+    bl_description = "Paste a copy kept in clipboard history (no decoding)\nstrokes on active layer, layers at their frames"
+    bl_options = {"REGISTER"}
+
+    slot : bpy.props.IntProperty(name='Slot', default=0)
+
+    trace_name = 'paste_slot'
+    done_message = 'Pasted from history'
+    unit = 'strokes'
+
+    @classmethod
+    def poll(cls, context):
+        return context.object and context.object.type == 'GPENCIL'
+
+    def load_clipboard(self):
+        slot = history.get(self.slot)
+        if slot is None:
+            self.report({'ERROR'}, 'This copy is no longer in clipboard history')
+            return None
+        if slot.is_layers:
+            self.unit = 'frames'
+            return slot.layers_data()
+        return slot.data
+
+    def steps_count(self, data):
+        if isinstance(data, dict):
+            return sum(len(allframes) for allframes in data.values())
+        return len(data)
+
+    def paste_steps(self, context, data, record):
+        if isinstance(data, dict):
+            return iter_paste_layers(data, record)
+        return iter_paste_strokes(data, use_current_frame=True, record=record)
+
+    @traced_operation('paste_slot')
+    def execute(self, context):
+        org_frame = context.scene.frame_current
+        t0 = time()
+        data = self.load_clipboard()
+        if data is None:
+            return {"CANCELLED"}
+        for _ in self.paste_steps(context, data, None):
+            pass
+        if context.scene.frame_current != org_frame:
+            context.scene.frame_set(org_frame)
+        self.report({'INFO'}, f'Pasted from history (time : {time() - t0:.4f})')
+        return {"FINISHED"}
+
+class GPCLIP_OT_remove_slot(bpy.types.Operator):
+    bl_idname = "gp.remove_slot"
+    bl_label = "GP Remove from history"
+    bl_description = "Remove this copy from clipboard history"
+    bl_options = {"REGISTER", "INTERNAL"}
+
+    slot : bpy.props.IntProperty(name='Slot', default=0)
+
+    def execute(self, context):
+        history.remove(self.slot)
+        return {"FINISHED"}
+
 ##--PANEL
 
 class GPCLIP_PT_clipboard_ui(bpy.types.Panel):
@@ -636,16 +1777,70 @@ class GPCLIP_PT_clipboard_ui(bpy.types.Panel):
         layout.operator('gp.paste_strokes', text='Paste strokes', icon='PASTEDOWN')
         layout.separator()
         layout.operator('gp.copy_multi_strokes', text='Copy layers', icon='COPYDOWN')
-        layout.operator('gp.paste_multi_strokes', text='Paste layers', icon='PASTEDOWN')
+        row = layout.row(align=True)
+        row.operator('gp.paste_multi_strokes', text='Paste layers', icon='PASTEDOWN')
+        row.operator('gp.paste_selected_strokes', text='', icon='FILTER')
+        if background_status:
+            layout.label(text=background_status)
+
+class GPCLIP_PT_clipboard_history(bpy.types.Panel):
+    bl_label = "History"
+    bl_space_type = "VIEW_3D"
+    bl_region_type = "UI"
+    bl_category = "Gpencil"
+    bl_parent_id = "GPCLIP_PT_clipboard_ui"
+    bl_options = {'DEFAULT_CLOSED'}
+
+    def draw(self, context):
+        layout = self.layout
+        if not history.slots:
+            layout.label(text='No copy in history')
+            return
+        col = layout.column(align=True)
+        for slot in history.newest_first():
+            row = col.row(align=True)
+            row.operator('gp.paste_slot', text=f'{slot.time} {slot.name}', icon='PASTEDOWN').slot = slot.uid
+            row.operator('gp.remove_slot', text='', icon='X').slot = slot.uid
+        layout.label(text=f'{len(history.slots)} slots, {history.size / 2**20:.1f} MB')
+
+class GPCLIP_PT_clipboard_perf(bpy.types.Panel):
+    bl_label = "Timing"
+    bl_space_type = "VIEW_3D"
+    bl_region_type = "UI"
+    bl_category = "Gpencil"
+    bl_parent_id = "GPCLIP_PT_clipboard_ui"
+    bl_options = {'DEFAULT_CLOSED'}
+
+    def draw(self, context):
+        layout = self.layout
+        layout.prop(get_addon_prefs(), 'profile_next')
+        if tracer.last_profile:
+            layout.label(text=f'Profile: {os.path.basename(tracer.last_profile)}', icon='FILE')
+
+        if not tracer.history:
+            layout.label(text='No operation recorded')
+            return
+        ## most recent first, with the longest phases
+        for trace in reversed(tracer.history):
+            col = layout.box().column(align=True)
+            col.label(text=f'{trace.name}: {trace.total * 1000:.1f} ms')
+            for name, duration in trace.summary(limit=4):
+                col.label(text=f'  {name}: {duration * 1000:.1f} ms')
+            if 'decoded_bytes' in trace.peaks:
+                col.label(text=f'  peak decoded: {trace.peaks["decoded_bytes"] / 2**20:.1f} MB')
 
 ## Addons Preferences Update Panel
 def update_panel(self, context):
-    try:
-        bpy.utils.unregister_class(GPCLIP_PT_clipboard_ui)
-    except:
-        pass
-    GPCLIP_PT_clipboard_ui.bl_category = get_addon_prefs().category
-    bpy.utils.register_class(GPCLIP_PT_clipboard_ui)
+    ## sub-panel follow the parent category, must be unregistered first and registered after
+    panels = (GPCLIP_PT_clipboard_ui, GPCLIP_PT_clipboard_history, GPCLIP_PT_clipboard_perf)
+    for panel in reversed(panels):
+        try:
+            bpy.utils.unregister_class(panel)
+        except:
+            pass
+    for panel in panels:
+        panel.bl_category = get_addon_prefs().category
+        bpy.utils.register_class(panel)
 
 class GPCLIP_addon_prefs(bpy.types.AddonPreferences):
     bl_idname = __name__ # os.path.splitext(__name__)[0]
@@ -656,6 +1851,97 @@ class GPCLIP_addon_prefs(bpy.types.AddonPreferences):
         default="Gpencil",
         update=update_panel)
 
+    clipboard_format : bpy.props.EnumProperty(
+        name="Clipboard Format",
+        description="Encoding of copied strokes (paste read both formats)",
+        default='BINARY',
+        items=(
+            ('BINARY', 'Binary', 'Compact columnar binary payload, much smaller and faster', 0),
+            ('JSON', 'Json', 'Legacy json text payload, readable by older versions of the addon', 1),
+            ('SHARED_MEMORY', 'Shared Memory', 'Uncompressed arrays in shared memory, only a reference is copied (python 3.8+)\nPaste in any Blender session of this computer while this one stay open', 2),
+            ))
+
+    precision : bpy.props.EnumProperty(
+        name="Precision",
+        description="Precision of copied binary payload",
+        default='FULL',
+        items=(
+            ('FULL', 'Full', 'Store attributes as float32, lossless', 0),
+            ('REDUCED', 'Reduced', 'Quantize coordinates on a grid over the bounding box of each drawing, other attributes as float16 (vertex color 8 bits)\nMax error is shown after copy', 1),
+            ))
+
+    coordinate_bits : bpy.props.IntProperty(
+        name="Coordinate Bits",
+        description="Coordinates grid resolution in reduced precision: 2^bits steps over the drawing bounding box on each axis",
+        default=16, min=8, max=24)
+
+    background_encode : bpy.props.BoolProperty(
+        name="Encode In Background",
+        description="Copy from buttons and shortcuts return immediately, payload is encoded in a worker thread and written to clipboard when ready",
+        default=True)
+
+    decoded_cache_size : bpy.props.IntProperty(
+        name="Decoded Cache (MB)",
+        description="Memory kept for decoded clipboard payloads, pasting again the same clipboard skip decoding (0 to disable)",
+        default=256, min=0)
+
+    encoded_cache_size : bpy.props.IntProperty(
+        name="Encoded Cache (MB)",
+        description="Memory kept for extracted and encoded frames of layers copy, copying again only extract and encode the frames changed since (0 to disable)",
+        default=256, min=0)
+
+    history_slots : bpy.props.IntProperty(
+        name="History Slots",
+        description="Number of copies kept in the session clipboard history (0 to disable)",
+        default=10, min=0, max=100)
+
+    history_size : bpy.props.IntProperty(
+        name="History Budget (MB)",
+        description="Memory kept for copies in clipboard history, least recently used are dropped beyond",
+        default=512, min=1)
+
+    paste_slice : bpy.props.IntProperty(
+        name="Paste Time Slice (ms)",
+        description="Interactive paste work by slices of this duration between redraws (progress shown in status bar, Esc to cancel)",
+        default=50, min=5, max=1000)
+
+    decode_ahead : bpy.props.IntProperty(
+        name="Decode Ahead (frames)",
+        description="Maximum frames decoded at a time during layers paste, the frame being pasted included (peak of decoded frames)\nlower use less memory on huge layers paste, 1 decode a single frame at a time (no parallel decoding)",
+        default=8, min=1, max=64)
+
+    spill_size : bpy.props.IntProperty(
+        name="Disk Cache Above (MB)",
+        description="Binary payloads bigger than this are written in the disk cache and only a reference is copied to the clipboard (0 to always use the clipboard)\nThe reference can only be pasted on this computer",
+        default=32, min=0)
+
+    cache_budget : bpy.props.IntProperty(
+        name="Disk Cache Budget (MB)",
+        description="Maximum size of the disk cache, least recently used payloads are deleted beyond",
+        default=2048, min=1)
+
+    cache_directory : bpy.props.StringProperty(
+        name="Disk Cache Directory",
+        description="Where big payloads are written, leave empty to use the temp directory",
+        default="",
+        subtype='DIR_PATH')
+
+    trace_history : bpy.props.IntProperty(
+        name="Timing History",
+        description="Number of operations kept in the timing panel",
+        default=20, min=1, max=200)
+
+    trace_file : bpy.props.StringProperty(
+        name="Trace File",
+        description="Append per phase timing of each operation to this file (one json line per operation), leave empty to disable",
+        default="",
+        subtype='FILE_PATH')
+
+    profile_next : bpy.props.BoolProperty(
+        name="Profile Next Operation",
+        description="Run the next clipboard operation under cProfile and write the stats in temp directory",
+        default=False)
+
     def draw(self, context):
             layout = self.layout
             ## TAB CATEGORY 
@@ -664,6 +1950,37 @@ class GPCLIP_addon_prefs(bpy.types.AddonPreferences):
             row.label(text="Panel Category:")
             row.prop(self, "category", text="")
 
+            layout.prop(self, "clipboard_format")
+            if self.clipboard_format == 'SHARED_MEMORY' and not clipshm.available:
+                layout.label(text='Shared memory need python 3.8+, binary clipboard is used', icon='ERROR')
+            row = layout.row()
+            row.prop(self, "precision")
+            if self.precision == 'REDUCED':
+                row.prop(self, "coordinate_bits")
+
+            layout.prop(self, "background_encode")
+            row = layout.row()
+            row.prop(self, "paste_slice")
+            row.prop(self, "decode_ahead")
+            row = layout.row()
+            row.prop(self, "decoded_cache_size")
+            row.prop(self, "encoded_cache_size")
+            row = layout.row()
+            row.prop(self, "history_slots")
+            row.prop(self, "history_size")
+
+            box = layout.box()
+            box.label(text="Disk Cache:")
+            box.prop(self, "spill_size")
+            box.prop(self, "cache_budget")
+            box.prop(self, "cache_directory")
+
+            box = layout.box()
+            box.label(text="Timing:")
+            box.prop(self, "trace_history")
+            box.prop(self, "trace_file")
+            box.prop(self, "profile_next")
+
 
 def get_addon_prefs():
     import os
@@ -736,14 +2053,28 @@ GPCLIP_OT_cut_strokes,
 GPCLIP_OT_paste_strokes,
 GPCLIP_OT_copy_multi_strokes,
 GPCLIP_OT_paste_multi_strokes,
+GPCLIP_OT_paste_selected_strokes,
+GPCLIP_OT_paste_slot,
+GPCLIP_OT_remove_slot,
 GPCLIP_PT_clipboard_ui,
+GPCLIP_PT_clipboard_history,
+GPCLIP_PT_clipboard_perf,
 GPCLIP_addon_prefs,
 )
 
+transform_cache_handlers = (
+    bpy.app.handlers.frame_change_post,
+    bpy.app.handlers.depsgraph_update_post,
+    bpy.app.handlers.load_post,
+)
+
 def register():
     for cl in classes:
         bpy.utils.register_class(cl)
 
+    for handler in transform_cache_handlers:
+        handler.append(clear_transform_cache)
+
     ## update tab name with update in pref file (passing addon_prefs)
     update_panel(get_addon_prefs(), bpy.context)
 
@@ -752,6 +2083,16 @@ def register():
 
 
 def unregister():
+    for handler in transform_cache_handlers:
+        if clear_transform_cache in handler:
+            handler.remove(clear_transform_cache)
+    transform_cache.clear()
+    stop_background_copy()
+    decoded_cache.clear()
+    encoded_cache.clear()
+    history.clear()
+    clipshm.release_all()
+
     for cl in reversed(classes):
         bpy.utils.unregister_class(cl)
     unregister_keymaps()
@@ -0,0 +1,185 @@
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTIBILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+'''Memory caches of decoded payloads and encoded blocks (no bpy dependency)
+
+Decoded stroke lists / layers dics are kept by content hash of the clipboard
+text, a paste of the same clipboard skip decoding entirely and a changed
+clipboard never match an old entry. The cache is bounded by the estimated
+memory of decoded payloads, least recently used ones are dropped first.
+Decoded payloads are only read by paste (never modified) so they can be shared.
+
+Encoded blocks of layers copy are kept by frame with a fingerprint of the raw
+points arrays read from blender (see clipformat.strokes_fingerprint): copying
+again the same layers after a few edits only extract and encode the changed frames.
+'''
+
+import hashlib
+import threading
+from collections import OrderedDict
+
+point_dict_bytes = 600# rough size of a decoded json point dic
+
+
+def content_key(text):
+    '''Fast hash of clipboard text'''
+    return hashlib.blake2b(text.encode('utf-8', 'surrogatepass'), digest_size=16).hexdigest()
+
+def stroke_list_size(strokes):
+    size = 0
+    for s in strokes:
+        points = s['points']
+        if isinstance(points, dict):
+            size += sum(getattr(v, 'nbytes', 0) for v in points.values())
+        else:
+            size += len(points) * point_dict_bytes
+    return size
+
+def payload_size(data):
+    '''Estimated memory of a decoded stroke list or layers dic (stroke list shared by frames counted once)'''
+    if not isinstance(data, dict):
+        return stroke_list_size(data)
+    seen = set()
+    size = 0
+    for frames in data.values():
+        for strokes in frames.values():
+            if id(strokes) not in seen:
+                seen.add(id(strokes))
+                size += stroke_list_size(strokes)
+    return size
+
+
+class DecodedCache:
+    '''LRU of decoded payloads bounded by their estimated size in bytes'''
+
+    def __init__(self, budget=256 * 2**20):
+        self.budget = budget
+        self.entries = OrderedDict()# key: (data, size)
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return entry[0]
+
+    def sizeof(self, data):
+        return payload_size(data)
+
+    def put(self, key, data):
+        size = self.sizeof(data)
+        if key in self.entries:
+            self.remove(key)
+        if size > self.budget:
+            # would evict everything and still not fit
+            return
+        self.entries[key] = (data, size)
+        self.size += size
+        self.evict()
+
+    def remove(self, key):
+        data, size = self.entries.pop(key)
+        self.size -= size
+        return data
+
+    def evict(self):
+        while self.size > self.budget and self.entries:
+            self.remove(next(iter(self.entries)))
+
+    def set_budget(self, budget):
+        self.budget = budget
+        self.evict()
+
+    def clear(self):
+        self.entries.clear()
+        self.size = 0
+
+
+
+class EncodedCache(DecodedCache):
+    '''LRU of encoded frames of layers copy by (object, layer, frame), bounded by block and arrays bytes
+    entry: (fingerprint, stroke list, (key, block, errors)), the fingerprint is computed from raw
+    points arrays before extraction (see copy_frame_cached in __init__)
+    stroke lists extracted on main thread are registered (add) then their blocks are got / put
+    by stroke list in encode_layer, possibly in worker threads, access is locked
+    '''
+
+    def __init__(self, budget=256 * 2**20):
+        super().__init__(budget)
+        self.lock = threading.Lock()
+        self.pending = {}# id(stroke list): (frame key, fingerprint, stroke list) waiting for their block
+        self.lists = {}# id(stroke list): frame key of cached entries
+
+    def sizeof(self, entry):
+        return len(entry[2][1]) + stroke_list_size(entry[1])
+
+    def frame(self, frame_key, fingerprint):
+        '''Return the stroke list of a frame cached by a previous copy if its fingerprint is unchanged, else None'''
+        with self.lock:
+            entry = self.entries.get(frame_key)
+            if entry is None or entry[0][0] != fingerprint:
+                return None
+            self.entries.move_to_end(frame_key)
+            return entry[0][1]
+
+    def add(self, frame_key, fingerprint, strokes):
+        '''Register the stroke list extracted for a frame, it is cached once its block is encoded (put)'''
+        with self.lock:
+            self.pending[id(strokes)] = (frame_key, fingerprint, strokes)
+
+    def get(self, strokes):
+        '''Return cached (key, block, errors) of a stroke list, None if it has to be encoded'''
+        with self.lock:
+            frame_key = self.lists.get(id(strokes))
+            entry = self.entries.get(frame_key) if frame_key is not None else None
+            if entry is None or entry[0][1] is not strokes:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.entries.move_to_end(frame_key)
+            return entry[0][2]
+
+    def put(self, strokes, encoded):
+        '''Cache the encoded block of a stroke list registered by add (others are ignored)'''
+        with self.lock:
+            pending = self.pending.pop(id(strokes), None)
+            if pending is None:
+                return
+            frame_key, fingerprint, strokes = pending
+            super().put(frame_key, (fingerprint, strokes, encoded))
+            if frame_key in self.entries:
+                self.lists[id(strokes)] = frame_key
+
+    def remove(self, key):
+        entry = super().remove(key)
+        self.lists.pop(id(entry[1]), None)
+        return entry
+
+    def set_budget(self, budget):
+        with self.lock:
+            super().set_budget(budget)
+
+    def clear(self):
+        with self.lock:
+            super().clear()
+            self.pending.clear()
+            self.lists.clear()
+
+
+decoded_cache = DecodedCache()
+encoded_cache = EncodedCache()
@@ -0,0 +1,593 @@
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTIBILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+'''Compact columnar binary clipboard payload (no bpy dependency)
+
+text payload : PREFIX + base64(container)
+container    : MAGIC | version (uint16) | meta size (uint32) | meta json | blocks
+block        : zlib( meta size (uint32) | meta json | attribute columns )
+
+Coordinates are delta coded: first point of each stroke then differences
+with the previous point, bytes grouped by significance before compression.
+
+Lossy precision (optional): coordinates quantized on a grid over the block
+bounding box, other float attributes stored as float16 (vertex color 8 bits),
+decoded back to float32. The encodings are described in the block meta.
+
+Uncompressed containers (compress=False, for shared memory transport) store
+blocks as is, meta json are space padded and blocks start on 8 bytes so
+columns can be used in place as numpy arrays over the buffer.
+
+A block hold a list of strokes: stroke attributes and point counts in its meta,
+points attributes concatenated for all strokes in one column per attribute.
+Container meta describe the structure, a stroke list (single block) or
+a {layer: {frame: block key}} dic, and the (offset, size) of each block.
+Blocks of layers payload are content addressed: identical drawings
+(held frames, repeated bake) are stored once, keyed by their hash.
+Optional matrix tracks (one 4x4 float32 matrix per frame of a layer) let
+layers be stored in layer space, the drawing of a held frame on an animated
+object is then stored once and transformed per frame on decode.
+
+Container meta is the index of layers payload: a selection of layers and
+frame range (select_frames) only read and decode the blocks it reference.
+'''
+
+import json
+import zlib
+import hashlib
+import struct
+import base64
+import numpy as np
+from collections import deque
+from itertools import islice
+from concurrent.futures import Future, wait
+
+PREFIX = 'GPCLIP:'
+MAGIC = b'GPCB'
+VERSION = 2# encoded columns: quantized, half or delta (payloads without column encodings are written as version 1)
+
+compress_level = 1
+
+## point attributes columns: (name, item size, stored dtype, default value)
+columns = (
+    ('co', 3, '<f4', 0.0),
+    ('pressure', 1, '<f4', 1.0),
+    ('strength', 1, '<f4', 1.0),
+    ('vertex_color', 4, '<f4', 0.0),
+    ('uv_fill', 2, '<f4', 0.5),
+    ('uv_factor', 1, '<f4', 0.0),
+    ('uv_rotation', 1, '<f4', 0.0),
+    ('select', 1, 'u1', 0),
+)
+
+column_specs = {c[0]: c[1:] for c in columns}
+
+## reduced precision storage of attributes columns (coordinates use a grid, see encode_block)
+half_columns = {
+    'pressure': '<f2',
+    'strength': '<f2',
+    'uv_fill': '<f2',
+    'uv_factor': '<f2',
+    'uv_rotation': '<f2',
+    'vertex_color': 'u1',# 0-1 range on 256 steps
+}
+
+## smooth along strokes, delta coded
+delta_columns = ('co', 'pressure', 'strength')
+
+_uint32 = struct.Struct('<I')
+_header = struct.Struct('<4sHI')
+
+ALIGN = 8
+
+
+def _padded(meta_bytes, before):
+    '''Pad meta json with spaces so data following it start aligned'''
+    return meta_bytes + b' ' * (-(before + len(meta_bytes)) % ALIGN)
+
+
+def is_payload(text):
+    '''Return True if text is a binary clipboard payload (else legacy json)'''
+    return isinstance(text, str) and text.startswith(PREFIX)
+
+def points_count(points):
+    '''Number of points in a columnar points dic'''
+    return len(points['co'])
+
+def quantize_column(col, bits):
+    '''Quantize a (n, size) float column on a grid of 2**bits steps over its bounding box
+    return stored integer array and its encoding (restored = stored * scale + offset)
+    '''
+    low = col.min(axis=0).astype(np.float64)
+    extent = col.max(axis=0) - low
+    steps = 2**bits - 1
+    scale = extent / steps
+    inverse = np.divide(steps, extent, out=np.zeros_like(extent), where=extent > 0)
+    stored = np.rint((col - low) * inverse).astype('<u2' if bits <= 16 else '<u4')
+    return stored, {'dtype': stored.dtype.str, 'scale': scale.tolist(), 'offset': low.tolist()}
+
+def reduce_column(name, col, bits=0, half=False):
+    '''Return (stored array, encoding) of a column with reduced precision, encoding None when stored as is'''
+    if not len(col):
+        return col, None
+    if name == 'co' and bits:
+        return quantize_column(col, bits)
+    if half and name in half_columns:
+        dtype = half_columns[name]
+        if dtype == 'u1':
+            stored = np.rint(np.clip(col, 0.0, 1.0) * 255).astype(dtype)
+            return stored, {'dtype': dtype, 'scale': 1 / 255, 'offset': 0.0}
+        return col.astype(dtype), {'dtype': dtype}
+    return col, None
+
+def stroke_starts(counts):
+    '''Index of the first point of each non empty stroke and their point counts'''
+    counts = np.asarray(counts, dtype=np.int64)
+    starts = np.cumsum(counts) - counts
+    filled = counts > 0
+    return starts[filled], counts[filled]
+
+def _as_uint(arr):
+    return arr.view(f'<u{arr.dtype.itemsize}')
+
+def delta_encode(stored, counts):
+    '''Replace each point by its difference with the previous point of the stroke,
+    first point of strokes stay absolute. Float are differenced on their bits
+    (modular unsigned integer arithmetic) so decoding is exact.
+    '''
+    values = _as_uint(np.ascontiguousarray(stored))
+    deltas = values.copy()
+    deltas[1:] -= values[:-1]
+    starts, _counts = stroke_starts(counts)
+    deltas[starts] = values[starts]
+    return deltas.view(stored.dtype)
+
+def delta_decode(deltas, counts):
+    '''Vectorized inverse of delta_encode: one cumulative sum for all strokes,
+    minus the sum reached before each stroke start
+    '''
+    values = np.cumsum(_as_uint(deltas), axis=0, dtype=f'<u{deltas.dtype.itemsize}')
+    starts, filled_counts = stroke_starts(counts)
+    before = np.zeros((len(starts),) + values.shape[1:], dtype=values.dtype)
+    before[starts > 0] = values[starts[starts > 0] - 1]
+    values -= np.repeat(before, filled_counts, axis=0)
+    return values.view(deltas.dtype)
+
+def shuffle_bytes(arr):
+    '''Group bytes by significance (all first bytes, then all second...) to help compression'''
+    itemsize = arr.dtype.itemsize
+    return np.ascontiguousarray(arr).view('u1').reshape(-1, itemsize).T.tobytes()
+
+def unshuffle_bytes(raw, dtype, count, offset):
+    '''Read count items of dtype from shuffled bytes at offset'''
+    itemsize = np.dtype(dtype).itemsize
+    planes = np.frombuffer(raw, dtype='u1', count=count*itemsize, offset=offset)
+    return np.ascontiguousarray(planes.reshape(itemsize, count).T).view(dtype).ravel()
+
+def restore_column(stored, encoding, dtype):
+    '''Vectorized inverse of reduce_column'''
+    if 'scale' in encoding:
+        restored = stored * np.asarray(encoding['scale']) + np.asarray(encoding['offset'])
+        return restored.astype(dtype)
+    return stored.astype(dtype)
+
+def encode_block(strokes, compress=True, bits=0, half=False, errors=None, delta=False):
+    '''Pack a list of strokes (points being a dic of arrays) in a compressed block
+    bits: quantize coordinates on a grid of 2**bits steps over the block bounding box (0 keep float32)
+    half: store other float attributes as float16 (vertex color as 8 bits)
+    errors: optional dic updated with the max absolute error of each reduced attribute
+    delta: store coordinates (and delta_columns) as per stroke start point + deltas, bytes shuffled (lossless)
+    '''
+    counts = [points_count(s['points']) for s in strokes]
+    total = sum(counts)
+    present = [c for c in columns if any(c[0] in s['points'] for s in strokes)]
+
+    encodings = {}
+    data_parts = []
+    for name, size, dtype, default in present:
+        col = np.empty((total, size), dtype=dtype)
+        start = 0
+        for s, n in zip(strokes, counts):
+            values = s['points'].get(name)
+            col[start:start+n] = default if values is None else np.reshape(values, (n, size))
+            start += n
+        stored, encoding = reduce_column(name, col, bits, half)
+        if encoding and errors is not None:
+            error = float(np.abs(restore_column(stored, encoding, dtype) - col).max())
+            errors[name] = max(errors.get(name, 0.0), error)
+        if delta and name in delta_columns and total:
+            encoding = dict(encoding or {'dtype': dtype})
+            encoding.update(delta=True, shuffle=True)
+            data_parts.append(shuffle_bytes(delta_encode(stored, counts)))
+        else:
+            data_parts.append(stored.tobytes())
+        if encoding:
+            encodings[name] = encoding
+
+    meta = {
+        'strokes': [{k: v for k, v in s.items() if k != 'points'} for s in strokes],
+        'counts': counts,
+        'columns': [c[0] for c in present],
+    }
+    if encodings:
+        meta['encodings'] = encodings
+    meta_bytes = _padded(json.dumps(meta).encode('utf-8'), _uint32.size)
+
+    raw = b''.join([_uint32.pack(len(meta_bytes)), meta_bytes] + data_parts)
+    return zlib.compress(raw, compress_level) if compress else raw
+
+def decode_block(data, compressed=True):
+    '''Unpack a compressed block, return the strokes list (points as dic of arrays)
+    uncompressed block arrays are views on data (no copy)
+    '''
+    raw = zlib.decompress(data) if compressed else data
+    meta_size, = _uint32.unpack_from(raw, 0)
+    meta = json.loads(bytes(raw[4:4+meta_size]).decode('utf-8'))
+    counts = meta['counts']
+    total = sum(counts)
+
+    encodings = meta.get('encodings', {})
+    offset = 4 + meta_size
+    cols = {}
+    for name in meta['columns']:
+        size, dtype, _default = column_specs[name]
+        encoding = encodings.get(name)
+        if not encoding:
+            arr = np.frombuffer(raw, dtype=dtype, count=total*size, offset=offset)
+            offset += arr.nbytes
+        else:
+            if encoding.get('shuffle'):
+                arr = unshuffle_bytes(raw, encoding['dtype'], total*size, offset)
+            else:
+                arr = np.frombuffer(raw, dtype=encoding['dtype'], count=total*size, offset=offset)
+            offset += arr.nbytes
+            arr = arr.reshape(total, size)
+            if encoding.get('delta'):
+                arr = delta_decode(arr, counts)
+            arr = restore_column(arr, encoding, dtype).ravel()
+        if name == 'select':
+            arr = arr.view(bool)
+        cols[name] = arr.reshape(total, size) if size > 1 else arr
+
+    strokes = []
+    start = 0
+    for sdic, n in zip(meta['strokes'], counts):
+        sdic['points'] = {name: arr[start:start+n] for name, arr in cols.items()}
+        strokes.append(sdic)
+        start += n
+    return strokes
+
+
+def block_key(block):
+    '''Content hash of an encoded block'''
+    return hashlib.blake2b(block, digest_size=16).hexdigest()
+
+def encode_track(matrices, compress=True):
+    '''Pack a list of 4x4 matrices in a compressed block of 16 float32 per matrix'''
+    track = np.asarray(matrices, dtype='<f4').reshape(-1, 16).tobytes()
+    return zlib.compress(track, compress_level) if compress else track
+
+def decode_track(data, compressed=True):
+    '''Unpack a compressed matrix track block to a (n, 4, 4) array'''
+    raw = zlib.decompress(data) if compressed else data
+    return np.frombuffer(raw, dtype='<f4').reshape(-1, 4, 4)
+
+def strokes_nbytes(strokes, columns=None):
+    '''Bytes of point arrays of a decoded stroke list (only given columns if set)'''
+    return sum(arr.nbytes for s in strokes for name, arr in s['points'].items()
+        if columns is None or name in columns)
+
+def transform_strokes(strokes, matrix):
+    '''Return copies of strokes with coordinates transformed by matrix,
+    in a single product for all points of the stroke list
+    '''
+    if not strokes:
+        return []
+    m = np.asarray(matrix, dtype=np.float64)
+    co = np.concatenate([np.reshape(s['points']['co'], (-1, 3)) for s in strokes])
+    co = co @ m[:3, :3].T + m[:3, 3]
+
+    transformed = []
+    start = 0
+    for s in strokes:
+        n = points_count(s['points'])
+        ts = dict(s)
+        ts['points'] = dict(s['points'])
+        ts['points']['co'] = co[start:start+n]
+        transformed.append(ts)
+        start += n
+    return transformed
+
+
+def strokes_fingerprint(strokes, settings=None):
+    '''Cheap content hash of a stroke list (points as dic of arrays) and its settings (json serializable)
+    stroke and point counts, stroke attributes and raw bytes of point arrays (no encoding)
+    '''
+    h = hashlib.blake2b(digest_size=16)
+    attributes = [{k: v for k, v in s.items() if k != 'points'} for s in strokes]
+    counts = [points_count(s['points']) for s in strokes]
+    h.update(json.dumps([settings, counts, attributes]).encode('utf-8'))
+    for s in strokes:
+        for name, arr in sorted(s['points'].items()):
+            arr = np.ascontiguousarray(arr)
+            h.update(f'{name}:{arr.dtype.str}'.encode('utf-8'))
+            h.update(arr.data.cast('B'))
+    return h.hexdigest()
+
+def encode_layer(frames, compress=True, bits=0, half=False, delta=False, cache=None):
+    '''Encode the blocks of a {frame: stroke list} dic, return ({frame: (key, block)}, errors)
+    the same stroke list object is encoded once
+    cache: optional dic-like (get/put) of (key, block, errors) by stroke list object,
+    frames unchanged since a previous copy reuse their block (see clipcache.EncodedCache)
+    '''
+    errors = {}
+    encoded = {}
+    blocks = {}
+    for fnum, strokes in frames.items():
+        if id(strokes) not in encoded:
+            entry = cache.get(strokes) if cache is not None else None
+            if entry is None:
+                block_errors = {}
+                block = encode_block(strokes, compress, bits, half, block_errors, delta)
+                entry = (block_key(block), block, block_errors)
+                if cache is not None:
+                    cache.put(strokes, entry)
+            key, block, block_errors = entry
+            for name, error in block_errors.items():
+                errors[name] = max(errors.get(name, 0.0), error)
+            encoded[id(strokes)] = (key, block)
+        blocks[fnum] = encoded[id(strokes)]
+    return blocks, errors
+
+def encode_container(data, tracks=None, compress=True, bits=0, half=False, errors=None, delta=False, executor=None, cache=None):
+    '''Encode a stroke list or a {layer: {frame: stroke list}} dic to container bytes
+    tracks is an optional {layer: {frame: 4x4 matrix}} dic, stroke coordinates of those layers are then
+    in layer space and transformed by the frame matrix on decode (drawing held over an animated object is stored once)
+    compress=False keep blocks uncompressed and aligned, to be decoded in place
+    bits, half and errors: lossy precision options, delta: coordinates delta coding, see encode_block
+    executor: optional concurrent.futures executor, layers are then encoded in parallel
+    (zlib and most numpy work release the GIL, threads are enough)
+    cache: optional encoded blocks cache of layers frames, see encode_layer
+    '''
+    blocks = []
+    keys = {}
+    def add_block(block, key=None):
+        key = key or block_key(block)
+        if key not in keys:
+            keys[key] = len(blocks)
+            blocks.append(block)
+        return key
+
+    if isinstance(data, dict):
+        def layer_job(frames):
+            return encode_layer(frames, compress, bits, half, delta, cache)
+        if executor:
+            results = list(executor.map(layer_job, data.values()))
+        else:
+            results = [layer_job(frames) for frames in data.values()]
+
+        structure = {}
+        for layer, (layer_blocks, layer_errors) in zip(data, results):
+            structure[layer] = {str(fnum): add_block(block, key) for fnum, (key, block) in layer_blocks.items()}
+            if errors is not None:
+                for name, error in layer_errors.items():
+                    errors[name] = max(errors.get(name, 0.0), error)
+        kind = 'layers'
+    else:
+        structure = 0
+        blocks.append(encode_block(data, compress, bits, half, errors, delta))
+        kind = 'strokes'
+
+    meta = {'type': kind, 'data': structure}
+    if tracks:
+        meta['tracks'] = {layer: add_block(encode_track([matrices[fnum] for fnum in data[layer]], compress))
+            for layer, matrices in tracks.items()}
+    if not compress:
+        meta['compressed'] = False
+        blocks = [b + b'\0' * (-len(b) % ALIGN) for b in blocks]
+
+    positions = []
+    offset = 0
+    for b in blocks:
+        positions.append((offset, len(b)))
+        offset += len(b)
+    if kind == 'layers':
+        positions = {key: positions[i] for key, i in keys.items()}
+
+    meta['blocks'] = positions
+    meta_bytes = _padded(json.dumps(meta).encode('utf-8'), _header.size)
+    ## payloads with plain columns (no quantize, half or delta encoding) stay readable by version 1 readers,
+    ## delta coding is lossless but a version 1 reader cannot decode it
+    version = VERSION if bits or half or delta else 1
+    return b''.join([_header.pack(MAGIC, version, len(meta_bytes)), meta_bytes] + blocks)
+
+def read_meta(container):
+    '''Check container header, return (meta, start offset of blocks)'''
+    magic, version, meta_size = _header.unpack_from(container, 0)
+    if magic != MAGIC:
+        raise ValueError('Not a GP clipboard payload')
+    if version > VERSION:
+        raise ValueError(f'Clipboard payload version {version} is not supported (max {VERSION})')
+
+    start = _header.size + meta_size
+    meta = json.loads(bytes(container[_header.size:start]).decode('utf-8'))
+    return meta, start
+
+def block_reader(container, meta, start):
+    '''Return a function giving the raw bytes of a block from its key'''
+    def raw_block(key):
+        # bytes and mmap slices are copies: no view left alive on the buffer once decoded
+        offset, size = meta['blocks'][key]
+        return container[start+offset:start+offset+size]
+    return raw_block
+
+def select_frames(index, layers=None, frame_range=None):
+    '''Filter a {layer: {frame: value}} index (container meta data or decoded dic)
+    layers: names to keep (None for all), frame_range: inclusive (start, end) or None
+    '''
+    selected = {}
+    for layer, frames in index.items():
+        if layers is not None and layer not in layers:
+            continue
+        if frame_range is not None:
+            start, end = frame_range
+            frames = {fnum: value for fnum, value in frames.items() if start <= int(fnum) <= end}
+        if frames:
+            selected[layer] = frames
+    return selected
+
+def decode_container(container):
+    '''Decode container bytes (or any buffer, like a memory mapped file)
+    to a stroke list or a {layer: {frame: stroke list}} dic
+    arrays of an uncompressed container given as memoryview are views on it
+    '''
+    meta, start = read_meta(container)
+    compressed = meta.get('compressed', True)
+    raw_block = block_reader(container, meta, start)
+
+    decoded = {}
+    def block(key):
+        # each unique block is decoded once and shared by all frames referencing it
+        if key not in decoded:
+            decoded[key] = decode_block(raw_block(key), compressed)
+        return decoded[key]
+
+    if meta['type'] == 'strokes':
+        return block(meta['data'])
+
+    data = {layer: {int(fnum): block(key) for fnum, key in frames.items()}
+        for layer, frames in meta['data'].items()}
+
+    ## layers stored in layer space: apply each frame matrix of the track
+    for layer, key in meta.get('tracks', {}).items():
+        frames = data[layer]
+        for fnum, matrix in zip(list(frames), decode_track(raw_block(key), compressed)):
+            frames[fnum] = transform_strokes(frames[fnum], matrix)
+
+    return data
+
+def _run_now(func, *args):
+    '''Synchronous stand-in of executor.submit'''
+    future = Future()
+    try:
+        future.set_result(func(*args))
+    except Exception as e:
+        future.set_exception(e)
+    return future
+
+def iter_layer_frames(container, matrices=None, executor=None, ahead=8, layers=None, frame_range=None, memory=None):
+    '''Decode a layers container frame by frame, yield (layer, frame, stroke list) in payload order
+    layers, frame_range: optional selection (see select_frames), other blocks are never read
+    matrices: optional {layer: {frame: 4x4 matrix}} applied to coordinates (after the layer track)
+    executor: optional concurrent.futures executor decompressing, decoding and transforming frames in parallel,
+    at most `ahead` frames are decoded at a time, the yielded one included (bounded memory),
+    without executor frames are decoded one at a time when the consumer ask for them
+    memory: optional callable receiving the bytes of decoded arrays alive when each frame is yielded
+    A decoded block is kept only until the last frame using it is consumed,
+    a yielded frame is released when the consumer ask for the next one,
+    the next frame is submitted only then.
+    '''
+    meta, start = read_meta(container)
+    if meta['type'] != 'layers':
+        raise ValueError('Clipboard payload does not contain layers')
+    compressed = meta.get('compressed', True)
+    raw_block = block_reader(container, meta, start)
+    submit = executor.submit if executor else _run_now
+    ahead = max(1, ahead) if executor else 1
+
+    selected = select_frames(meta['data'], layers, frame_range)
+    frames = []# (layer, frame, block key, matrix or None)
+    for layer, layer_frames in meta['data'].items():
+        if layer not in selected:
+            continue
+        track = meta.get('tracks', {}).get(layer)
+        track = decode_track(raw_block(track), compressed) if track else None
+        layer_matrices = matrices.get(layer, {}) if matrices else {}
+        ## track matrices are by position in the whole layer
+        for i, (fnum, key) in enumerate(layer_frames.items()):
+            if fnum not in selected[layer]:
+                continue
+            fnum = int(fnum)
+            matrix = None
+            if track is not None:
+                matrix = track[i].astype(np.float64)
+            if fnum in layer_matrices:
+                world = np.asarray(layer_matrices[fnum], dtype=np.float64)
+                matrix = world if matrix is None else world @ matrix
+            frames.append((layer, fnum, key, matrix))
+
+    users = {}
+    for _layer, _fnum, key, _matrix in frames:
+        users[key] = users.get(key, 0) + 1
+
+    blocks = {}# key: future of decoded block
+    live = {}# block key or frame index: bytes of decoded arrays, set by the jobs
+    def block_job(key, data):
+        strokes = decode_block(data, compressed)
+        if memory:
+            live[key] = strokes_nbytes(strokes)
+        return strokes
+
+    def frame_job(n, block_future, matrix):
+        strokes = block_future.result()
+        if matrix is None:
+            return strokes
+        strokes = transform_strokes(strokes, matrix)
+        if memory:
+            # only coordinates are copied, other columns are shared with the block
+            live[n] = strokes_nbytes(strokes, ('co',))
+        return strokes
+
+    def submit_frame(n, layer, fnum, key, matrix):
+        # block is submitted before the frames waiting for it: no worker wait on an unscheduled job
+        if key not in blocks:
+            blocks[key] = submit(block_job, key, raw_block(key))
+        return submit(frame_job, n, blocks[key], matrix)
+
+    pending = deque()
+    queued = ((n,) + item for n, item in enumerate(frames))
+    try:
+        while True:
+            ## refill only once the consumer released the previous frame: at most `ahead` frames alive
+            for item in islice(queued, ahead - len(pending)):
+                pending.append((item, submit_frame(*item)))
+            if not pending:
+                break
+            (n, layer, fnum, key, _matrix), future = pending.popleft()
+            strokes = future.result()
+            future = None
+            users[key] -= 1
+            if not users[key]:
+                del blocks[key]
+            if memory:
+                memory(sum(list(live.values())))
+            yield layer, fnum, strokes
+            ## consumer is done with the frame: drop it before decoding further
+            strokes = None
+            live.pop(n, None)
+            if not users[key]:
+                live.pop(key, None)
+    finally:
+        ## stopped early: drop queued jobs and let running ones end before the buffer can be released
+        futures = [future for _item, future in pending] + list(blocks.values())
+        for future in futures:
+            future.cancel()
+        wait(futures)
+
+def wrap(container):
+    '''Container bytes to clipboard string'''
+    return PREFIX + base64.b64encode(container).decode('ascii')
+
+def unwrap(text):
+    '''Clipboard string to container bytes'''
+    return base64.b64decode(text[len(PREFIX):])
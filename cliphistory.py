@@ -0,0 +1,111 @@
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTIBILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+'''Session clipboard history (no bpy dependency)
+
+Each copy is also kept in a slot holding the extracted stroke data itself
+(arrays, no serialized string), pasting a slot skip encoding and decoding.
+Slots are dropped least recently used first (copy or paste) when the
+history exceed its slot count or memory budget.
+'''
+
+from time import strftime
+from itertools import count
+from collections import OrderedDict
+
+from .clipcache import payload_size
+from . import clipformat
+
+
+class Slot:
+    '''A copied stroke list or layers dic with its transform tracks'''
+
+    def __init__(self, uid, name, data, tracks=None):
+        self.uid = uid
+        self.name = name
+        self.data = data
+        self.tracks = tracks
+        self.size = payload_size(data)
+        self.time = strftime('%H:%M:%S')
+
+    @property
+    def is_layers(self):
+        return isinstance(self.data, dict)
+
+    def layers_data(self):
+        '''Layers dic with track matrices applied (stroke coordinates in world space)'''
+        if not self.tracks:
+            return self.data
+        data = {}
+        for layer, frames in self.data.items():
+            track = self.tracks.get(layer)
+            if not track:
+                data[layer] = frames
+                continue
+            data[layer] = {fnum: clipformat.transform_strokes(strokes, track[fnum])
+                for fnum, strokes in frames.items()}
+        return data
+
+
+class ClipboardHistory:
+    '''Slots by least recently used first, bounded by count and estimated memory'''
+
+    def __init__(self, budget=512 * 2**20, max_slots=10):
+        self.budget = budget
+        self.max_slots = max_slots
+        self.slots = OrderedDict()# uid: slot
+        self._uid = count(1)
+
+    @property
+    def size(self):
+        return sum(slot.size for slot in self.slots.values())
+
+    def add(self, name, data, tracks=None):
+        '''Store copied data in a new slot, return it (None if it can't fit in budget)'''
+        slot = Slot(next(self._uid), name, data, tracks)
+        if not self.max_slots or slot.size > self.budget:
+            return None
+        self.slots[slot.uid] = slot
+        self.evict()
+        return slot
+
+    def get(self, uid):
+        '''Return slot and mark it as recently used'''
+        slot = self.slots.get(uid)
+        if slot:
+            self.slots.move_to_end(uid)
+        return slot
+
+    def remove(self, uid):
+        self.slots.pop(uid, None)
+
+    def evict(self):
+        size = self.size
+        while self.slots and (len(self.slots) > self.max_slots or size > self.budget):
+            _uid, slot = self.slots.popitem(last=False)
+            size -= slot.size
+
+    def configure(self, budget, max_slots):
+        self.budget = budget
+        self.max_slots = max_slots
+        self.evict()
+
+    def newest_first(self):
+        '''Slots in creation order, newest first (for display)'''
+        return sorted(self.slots.values(), key=lambda slot: slot.uid, reverse=True)
+
+    def clear(self):
+        self.slots.clear()
+
+
+history = ClipboardHistory()
@@ -0,0 +1,137 @@
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTIBILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+'''Shared memory transport between Blender sessions of the same computer (no bpy dependency)
+
+Copy put an uncompressed container in a named shared memory block and only a
+descriptor (TOKEN_PREFIX + name + size + pid) go on the clipboard.
+Paste attach the block and decode in place: point arrays are views on the shared
+buffer handed directly to foreach_set.
+
+Lifetime:
+- the copying session own its block, a new shared memory copy release the previous one,
+  all owned blocks are unlinked on addon unregister and on session exit
+  (the multiprocessing resource tracker also unlink them if the session crash).
+  A descriptor is only valid while the copying session is open.
+- a pasting session keep the last attached block mapped (to paste it again cheaply),
+  it is closed when another block is pasted, on unregister and on exit.
+  Attached blocks are never unlinked by the pasting side.
+
+Need python 3.8+ (shared_memory module), available is False otherwise.
+'''
+
+import os
+import atexit
+from itertools import count
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:
+    shared_memory = None
+
+available = shared_memory is not None
+
+TOKEN_PREFIX = 'GPCLIP-SHM:'
+
+owned = []# blocks created by this session
+attached = {}# name: block attached by this session
+pending = []# closed blocks still referenced by decoded arrays
+_counter = count()
+
+
+def is_token(text):
+    '''Return True if text is a shared memory descriptor'''
+    return isinstance(text, str) and text.startswith(TOKEN_PREFIX)
+
+def parse_token(text):
+    '''Return (name, size, pid) of a descriptor'''
+    name, size, pid = text[len(TOKEN_PREFIX):].strip().split(':')
+    return name, int(size), int(pid)
+
+def publish(container):
+    '''Copy container bytes in a new shared memory block owned by this session, return its descriptor'''
+    if not available:
+        raise RuntimeError('Shared memory transport need python 3.8+')
+    release_owned()
+    name = f'gpclip_{os.getpid()}_{next(_counter)}'
+    block = shared_memory.SharedMemory(name=name, create=True, size=max(len(container), 1))
+    block.buf[:len(container)] = container
+    owned.append(block)
+    return f'{TOKEN_PREFIX}{block.name}:{len(container)}:{os.getpid()}'
+
+def _untrack(block):
+    '''Attaching register the block in the resource tracker, which would unlink it
+    when this session exit while the owner may still be open (python < 3.13)
+    '''
+    try:
+        from multiprocessing import resource_tracker
+        resource_tracker.unregister(block._name, 'shared_memory')
+    except Exception:
+        pass
+
+def attach(token):
+    '''Return a memoryview on the shared buffer of a descriptor
+    raise FileNotFoundError if the owner session released it or was closed
+    '''
+    if not available:
+        raise RuntimeError('Shared memory transport need python 3.8+')
+    name, size, pid = parse_token(token)
+    for block in owned:
+        if block.name == name:
+            return block.buf[:size]
+
+    if name not in attached:
+        close_attached()
+        try:
+            block = shared_memory.SharedMemory(name=name)
+        except FileNotFoundError:
+            raise FileNotFoundError(f'Shared clipboard {name} is no longer available (copying session {pid} was closed or copied again)') from None
+        if os.name == 'posix':
+            _untrack(block)
+        attached[name] = block
+    return attached[name].buf[:size]
+
+def _close(block):
+    try:
+        block.close()
+    except BufferError:
+        # arrays still reference the buffer, retried on next release
+        pending.append(block)
+
+def close_pending():
+    blocks = pending[:]
+    pending.clear()
+    for block in blocks:
+        _close(block)
+
+def close_attached():
+    close_pending()
+    for block in attached.values():
+        _close(block)
+    attached.clear()
+
+def release_owned():
+    for block in owned:
+        _close(block)
+        try:
+            block.unlink()
+        except FileNotFoundError:
+            pass
+    owned.clear()
+
+def release_all():
+    '''Close attached blocks and unlink owned ones'''
+    close_attached()
+    release_owned()
+
+atexit.register(release_all)
@@ -0,0 +1,107 @@
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTIBILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+'''Disk cache for payloads too large for the OS clipboard (no bpy dependency)
+
+Containers are written in a cache directory under their content hash,
+only a short token (TOKEN_PREFIX + hash + size) is placed on the clipboard.
+Paste memory map the file and decode from it, the clipboard string of the
+whole payload is never built.
+The directory is kept under a size budget by deleting the least recently used
+files (access time is refreshed with mtime on each store and load).
+'''
+
+import os
+import mmap
+import hashlib
+import tempfile
+
+TOKEN_PREFIX = 'GPCLIP-FILE:'
+EXTENSION = '.gpclip'
+
+directory = ''# default to temp directory
+budget = 1024 * 2**20# bytes kept in cache directory
+
+
+def cache_dir():
+    path = directory or os.path.join(tempfile.gettempdir(), 'gp_clipboard_cache')
+    os.makedirs(path, exist_ok=True)
+    return path
+
+def is_token(text):
+    '''Return True if text is a reference to a cached payload'''
+    return isinstance(text, str) and text.startswith(TOKEN_PREFIX)
+
+def parse_token(text):
+    '''Return (key, size) of a token'''
+    key, size = text[len(TOKEN_PREFIX):].strip().split(':')
+    return key, int(size)
+
+def file_path(key):
+    return os.path.join(cache_dir(), key + EXTENSION)
+
+def store(container):
+    '''Write container bytes in the cache (once per content) and return its token'''
+    key = hashlib.blake2b(container, digest_size=16).hexdigest()
+    path = file_path(key)
+    if os.path.exists(path):
+        os.utime(path)
+    else:
+        ## write then rename: a concurrent paste never read a partial file
+        tmp = f'{path}.{os.getpid()}.tmp'
+        with open(tmp, 'wb') as fd:
+            fd.write(container)
+        os.replace(tmp, path)
+    evict(keep=path)
+    return f'{TOKEN_PREFIX}{key}:{len(container)}'
+
+def open_mapped(token):
+    '''Memory map the cached file of token, the caller close the returned mmap
+    raise FileNotFoundError if the payload was evicted or the cache cleared
+    '''
+    key, size = parse_token(token)
+    path = file_path(key)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f'Clipboard payload {key} is no longer in cache ({cache_dir()})')
+    if os.path.getsize(path) != size:
+        raise ValueError(f'Clipboard payload {key} cache file is corrupted')
+    os.utime(path)
+    with open(path, 'rb') as fd:
+        return mmap.mmap(fd.fileno(), 0, access=mmap.ACCESS_READ)
+
+def entries():
+    '''List (mtime, size, path) of cached files, oldest first'''
+    found = []
+    with os.scandir(cache_dir()) as it:
+        for entry in it:
+            if entry.is_file() and entry.name.endswith(EXTENSION):
+                st = entry.stat()
+                found.append((st.st_mtime, st.st_size, entry.path))
+    found.sort()
+    return found
+
+def evict(keep=None):
+    '''Delete least recently used files until the cache fit in the budget (keep path is never deleted)'''
+    files = entries()
+    total = sum(f[1] for f in files)
+    for _mtime, size, path in files:
+        if total <= budget:
+            break
+        if path == keep:
+            continue
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total -= size
+    return total
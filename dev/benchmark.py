@@ -0,0 +1,384 @@
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTIBILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+'''Scaling benchmark of GP clipboard copy / cut / paste and layers copy / paste
+
+Run headless against the fake data model (dev/fake_bpy.py):
+    python dev/benchmark.py --points 100 --strokes 10 100 1000 --output bench.json
+
+Or in background Blender with the addon enabled (module name of the installed addon):
+    blender -b --python dev/benchmark.py -- --addon GP_clipboard --points 100 --strokes 100 1000
+
+Each case is run on a fresh synthetic scene for every combination of the grid
+(layers x frames x strokes x points per stroke), reporting wall time (best of --repeat),
+python peak memory (tracemalloc, separate run) and encoded payload bytes as json.
+
+Regression modes (exit code 1 on failure):
+    --baseline old.json --threshold 1.2 : fail if a case is 20% slower than in baseline
+    --max-exponent 1.15 : fail if time grows faster than total_points ** 1.15 (linearity check)
+'''
+
+import os
+import sys
+import json
+import argparse
+import platform
+import tracemalloc
+from time import perf_counter
+from itertools import product
+from math import log
+
+import numpy as np
+
+DEV_DIR = os.path.dirname(os.path.abspath(__file__))
+
+## case name: addon entry point it drives
+CASES = {
+    'copy': 'GPCLIP_OT_copy_strokes',
+    'cut': 'GPCLIP_OT_cut_strokes',
+    'paste': 'GPCLIP_OT_paste_strokes',
+    'add_multiple_strokes': 'add_multiple_strokes',
+    'copy_layers': 'GPCLIP_OT_copy_multi_strokes',
+    'paste_layers': 'GPCLIP_OT_paste_multi_strokes',
+}
+
+LAYER_CASES = ('copy_layers', 'paste_layers')
+
+
+class FakeBackend:
+    '''Drive the addon on the in-memory fake data model'''
+    name = 'fake'
+
+    def __init__(self, addon_name=None):
+        sys.path.insert(0, DEV_DIR)
+        import fake_bpy
+        self.fake = fake_bpy
+        self.addon = fake_bpy.load_addon()
+
+    def make_scene(self, **params):
+        return self.fake.make_scene(**params)
+
+    def run(self, op_name, **props):
+        result, _reports = self.fake.run_operator(getattr(self.addon, op_name), **props)
+        return result
+
+
+class BlenderBackend:
+    '''Drive the installed addon in (background) Blender'''
+    name = 'blender'
+
+    def __init__(self, addon_name):
+        import bpy
+        import addon_utils
+        import importlib
+        self.bpy = bpy
+        addon_utils.enable(addon_name, default_set=True)
+        self.addon = importlib.import_module(addon_name)
+
+    def make_scene(self, layers=1, frames=1, strokes=10, points=50, animated=False, select=True, seed=0, **_):
+        '''Synthetic scene with real data (parenting options are only available on fake backend)'''
+        bpy = self.bpy
+        rng = np.random.default_rng(seed)
+        for o in list(bpy.data.objects):
+            bpy.data.objects.remove(o)
+        for g in list(bpy.data.grease_pencils):
+            bpy.data.grease_pencils.remove(g)
+
+        scene = bpy.context.scene
+        scene.frame_start = 1
+        scene.frame_end = max(1 + frames, 2)
+        scene.frame_set(1)
+
+        gpd = bpy.data.grease_pencils.new('Stroke')
+        mat = bpy.data.materials.get('GPbench') or bpy.data.materials.new('GPbench')
+        if not mat.is_grease_pencil:
+            bpy.data.materials.create_gpencil_data(mat)
+        gpd.materials.append(mat)
+        obj = bpy.data.objects.new('Stroke', gpd)
+        scene.collection.objects.link(obj)
+        bpy.context.view_layer.objects.active = obj
+
+        if animated:
+            for f in (scene.frame_start, scene.frame_end):
+                obj.location = (0.01 * f, 0.0, 0.005 * f)
+                obj.keyframe_insert('location', frame=f)
+
+        for li in range(layers):
+            l = gpd.layers.new(f'Layer_{li}')
+            for fi in range(frames):
+                f = l.frames.new(1 + fi)
+                for _si in range(strokes):
+                    s = f.strokes.new()
+                    s.line_width = int(rng.integers(5, 50))
+                    s.points.add(points)
+                    co = np.cumsum(rng.normal(0.0, 0.01, (points, 3)), axis=0) + rng.uniform(-1.0, 1.0, 3)
+                    s.points.foreach_set('co', co.astype(np.float32).ravel())
+                    s.points.foreach_set('pressure', rng.uniform(0.2, 1.0, points).astype(np.float32))
+                    s.points.foreach_set('select', np.full(points, select))
+        return obj
+
+    def run(self, op_name, **props):
+        idname = getattr(self.addon, op_name).bl_idname.split('.')[1]
+        return getattr(self.bpy.ops.gp, idname)(**props)
+
+
+def select_half(obj):
+    '''Select first half of each stroke to exercise partial cut'''
+    for l in obj.data.layers:
+        for f in l.frames:
+            for s in f.strokes:
+                n = len(s.points)
+                sel = np.zeros(n, dtype=bool)
+                sel[:n // 2] = True
+                s.points.foreach_set('select', sel)
+
+
+def prepare(backend, case, params):
+    '''Build the scene of a case and return the function to measure'''
+    addon = backend.addon
+    obj = backend.make_scene(**params)
+
+    if case == 'copy':
+        return lambda: backend.run('GPCLIP_OT_copy_strokes')
+
+    if case == 'cut':
+        select_half(obj)
+        return lambda: backend.run('GPCLIP_OT_cut_strokes')
+
+    if case == 'paste':
+        backend.run('GPCLIP_OT_copy_strokes')
+        return lambda: backend.run('GPCLIP_OT_paste_strokes')
+
+    if case == 'add_multiple_strokes':
+        strokes = addon.copycut_strokes(copy=True)
+        layer = obj.data.layers[0]
+        return lambda: addon.add_multiple_strokes(strokes, layer)
+
+    if case == 'copy_layers':
+        return lambda: backend.run('GPCLIP_OT_copy_multi_strokes')
+
+    if case == 'paste_layers':
+        backend.run('GPCLIP_OT_copy_multi_strokes')
+        return lambda: backend.run('GPCLIP_OT_paste_multi_strokes')
+
+    raise ValueError(f'Unknown case {case}')
+
+
+def clear_caches(backend):
+    '''Each run of a seeded scene would hit the decoded / encoded caches of the previous one'''
+    backend.addon.decoded_cache.clear()
+    backend.addon.encoded_cache.clear()
+
+
+def last_trace(backend):
+    '''Last recorded operation trace, mark of the start of a case for payload_bytes'''
+    history = backend.addon.tracer.history
+    return history[-1] if history else None
+
+def payload_bytes(backend, since=None):
+    '''Encoded payload size of the last copy recorded after the trace since (see last_trace),
+    None if the case did not copy anything (the clipboard only hold a token for payloads
+    spilled to disk cache or published in shared memory)'''
+    for trace in reversed(backend.addon.tracer.history):
+        if trace is since:
+            break
+        if 'payload_bytes' in trace.counts:
+            return trace.counts['payload_bytes']
+    return None
+
+
+def measure(backend, case, params, repeat=1, memory=True):
+    '''Return result dic of a case (best time of repeat runs, peak memory of an extra run)'''
+    times = []
+    since = last_trace(backend)
+    for _ in range(repeat):
+        func = prepare(backend, case, params)
+        clear_caches(backend)
+        t0 = perf_counter()
+        func()
+        times.append(perf_counter() - t0)
+    payload = payload_bytes(backend, since)
+
+    peak = None
+    if memory:
+        func = prepare(backend, case, params)
+        clear_caches(backend)
+        tracemalloc.start()
+        func()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    total = params['layers'] * params['frames'] * params['strokes'] * params['points']
+    return dict(case=case, **params, total_points=total,
+        time=min(times), peak_memory=peak, payload_bytes=payload)
+
+
+def iter_grid(args):
+    for case in args.cases:
+        frames = args.frames if case in LAYER_CASES else [1]
+        for layers, nframes, strokes, points in product(args.layers, frames, args.strokes, args.points):
+            params = dict(layers=layers, frames=nframes, strokes=strokes, points=points)
+            if args.animated:
+                params['animated'] = True
+            yield case, params
+
+
+def result_key(r):
+    return (r['case'], r['layers'], r['frames'], r['strokes'], r['points'])
+
+
+def scaling_exponent(results):
+    '''Slope of log(time) over log(total points), None if not enough distinct sizes'''
+    pts = [(log(r['total_points']), log(max(r['time'], 1e-9))) for r in results]
+    if len({x for x, _y in pts}) < 2:
+        return
+    x = np.array([p[0] for p in pts])
+    y = np.array([p[1] for p in pts])
+    return float(np.polyfit(x, y, 1)[0])
+
+
+def check_regressions(results, baseline=None, threshold=1.2, max_exponent=None):
+    '''Return list of failure messages'''
+    failures = []
+    if baseline:
+        ref = {result_key(r): r for r in baseline['results']}
+        for r in results:
+            b = ref.get(result_key(r))
+            if not b:
+                continue
+            ratio = r['time'] / max(b['time'], 1e-9)
+            if ratio > threshold:
+                failures.append(f"{r['case']} {r['total_points']} points: {r['time']:.4f}s vs {b['time']:.4f}s (x{ratio:.2f})")
+
+    if max_exponent:
+        for case in {r['case'] for r in results}:
+            exp = scaling_exponent([r for r in results if r['case'] == case])
+            if exp is not None and exp > max_exponent:
+                failures.append(f'{case}: time scale as points^{exp:.2f} (max {max_exponent})')
+    return failures
+
+
+def plot(results, path):
+    try:
+        import matplotlib
+        matplotlib.use('Agg')
+        import matplotlib.pyplot as plt
+    except ImportError:
+        print('matplotlib is not available, no plot')
+        return
+
+    fig, (ax_time, ax_size) = plt.subplots(1, 2, figsize=(12, 5))
+    for case in sorted({r['case'] for r in results}):
+        rs = sorted((r for r in results if r['case'] == case), key=lambda r: r['total_points'])
+        x = [r['total_points'] for r in rs]
+        ax_time.loglog(x, [r['time'] for r in rs], marker='o', label=case)
+        sized = [r for r in rs if r['payload_bytes'] is not None]
+        if sized:
+            ax_size.loglog([r['total_points'] for r in sized], [max(r['payload_bytes'], 1) for r in sized], marker='o', label=case)
+    ax_time.set_xlabel('total points')
+    ax_time.set_ylabel('time (s)')
+    ax_size.set_xlabel('total points')
+    ax_size.set_ylabel('clipboard payload (bytes)')
+    for ax in (ax_time, ax_size):
+        ax.grid(True, which='both', alpha=0.3)
+        ax.legend()
+    fig.tight_layout()
+    fig.savefig(path)
+    print('plot saved to', path)
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description='GP clipboard scaling benchmark')
+    parser.add_argument('--cases', nargs='+', default=list(CASES), choices=list(CASES))
+    parser.add_argument('--points', nargs='+', type=int, default=[10, 100], help='points per stroke')
+    parser.add_argument('--strokes', nargs='+', type=int, default=[10, 100], help='strokes per frame')
+    parser.add_argument('--layers', nargs='+', type=int, default=[1])
+    parser.add_argument('--frames', nargs='+', type=int, default=[1, 10], help='frames per layer (layers cases)')
+    parser.add_argument('--animated', action='store_true', help='animate the object (bake on every frame)')
+    parser.add_argument('--repeat', type=int, default=1)
+    parser.add_argument('--no-memory', action='store_true', help='skip peak memory measure run')
+    parser.add_argument('--format', choices=('BINARY', 'JSON', 'SHARED_MEMORY'), default='BINARY', help='clipboard format')
+    parser.add_argument('--legacy', action='store_true', help='use per point fallback engine')
+    parser.add_argument('--output', help='json result file (default: print)')
+    parser.add_argument('--plot', help='save scaling curves to this image file')
+    parser.add_argument('--baseline', help='json result file to compare with')
+    parser.add_argument('--threshold', type=float, default=1.2, help='max time ratio against baseline')
+    parser.add_argument('--max-exponent', type=float, help='max scaling exponent of time over points')
+    parser.add_argument('--addon', default='GP_clipboard', help='addon module name (blender backend)')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv[sys.argv.index('--') + 1:] if '--' in sys.argv else sys.argv[1:]
+    args = parse_args(argv)
+
+    try:
+        import bpy
+        in_blender = not getattr(bpy, 'is_fake', False)
+    except ImportError:
+        in_blender = False
+    backend = BlenderBackend(args.addon) if in_blender else FakeBackend()
+
+    backend.addon.get_addon_prefs().clipboard_format = args.format
+    if args.legacy:
+        backend.addon.use_array_engine = False
+
+    # silence addon prints during measures
+    stdout = sys.stdout
+    results = []
+    for case, params in iter_grid(args):
+        sys.stdout = open(os.devnull, 'w')
+        try:
+            r = measure(backend, case, params, repeat=args.repeat, memory=not args.no_memory)
+        finally:
+            sys.stdout.close()
+            sys.stdout = stdout
+        results.append(r)
+        size = '-' if r['payload_bytes'] is None else r['payload_bytes']
+        print(f"{case:>22} {r['total_points']:>10} pts  {r['time']:9.4f}s  {size:>11} bytes")
+
+    report = {
+        'meta': {
+            'backend': backend.name,
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'format': args.format,
+            'engine': 'legacy' if args.legacy else 'array',
+        },
+        'results': results,
+    }
+
+    if args.output:
+        with open(args.output, 'w') as fd:
+            json.dump(report, fd, indent=1)
+    else:
+        print(json.dumps(report, indent=1))
+
+    if args.plot:
+        plot(results, args.plot)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as fd:
+            baseline = json.load(fd)
+    failures = check_regressions(results, baseline, args.threshold, args.max_exponent)
+    for f in failures:
+        print('REGRESSION:', f)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    code = main()
+    if code:
+        sys.exit(code)
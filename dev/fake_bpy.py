@@ -0,0 +1,833 @@
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTIBILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+'''In-memory stand-in of the bpy / mathutils parts used by GP clipboard
+
+Allow to run the addon functions and operators headless (plain python + numpy),
+for benchmarks and regression checks without a running Blender.
+
+    from fake_bpy import load_addon, make_scene
+    addon = load_addon()
+    obj = make_scene(layers=2, frames=3, strokes=10, points=50)
+    addon.copycut_strokes()
+
+Only the subset of the data model touched by the addon is implemented:
+object matrix_world (optionally animated), pose bones, grease pencil layers
+(with object or bone parent), frames, strokes and points collections with
+foreach_get / foreach_set.
+'''
+
+import os
+import sys
+import types
+import time
+import importlib.util
+from math import cos, sin
+import numpy as np
+
+
+### --- mathutils
+
+class Vector:
+    def __init__(self, seq=(0.0, 0.0, 0.0)):
+        self._v = np.array(seq, dtype=np.float32)
+
+    def __len__(self):
+        return len(self._v)
+
+    def __iter__(self):
+        return iter(self._v.tolist())
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return tuple(self._v[i].tolist())
+        return float(self._v[i])
+
+    def __setitem__(self, i, value):
+        self._v[i] = value
+
+    def __eq__(self, other):
+        return len(self) == len(other) and bool(np.all(self._v == np.asarray(other[:], dtype=np.float32)))
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return f'Vector({self[:]})'
+
+    def copy(self):
+        return type(self)(self._v)
+
+
+class Color(Vector):
+    pass
+
+
+class Matrix:
+    def __init__(self, rows=None):
+        self._m = np.identity(4) if rows is None else np.array([list(r) for r in rows], dtype=np.float64)
+
+    @classmethod
+    def _from_array(cls, arr):
+        m = cls.__new__(cls)
+        m._m = np.array(arr, dtype=np.float64)
+        return m
+
+    @classmethod
+    def Identity(cls, size):
+        return cls._from_array(np.identity(size))
+
+    @classmethod
+    def Translation(cls, vec):
+        m = np.identity(4)
+        m[:3, 3] = vec[:3]
+        return cls._from_array(m)
+
+    @classmethod
+    def Diagonal(cls, vec):
+        return cls._from_array(np.diag(vec[:]))
+
+    @classmethod
+    def Rotation(cls, angle, size, axis):
+        if isinstance(axis, str):
+            axis = {'X': (1, 0, 0), 'Y': (0, 1, 0), 'Z': (0, 0, 1)}[axis]
+        x, y, z = np.asarray(axis[:], dtype=np.float64) / np.linalg.norm(axis[:])
+        c, s = cos(angle), sin(angle)
+        t = 1 - c
+        rot = np.array([
+            [t*x*x + c, t*x*y - s*z, t*x*z + s*y],
+            [t*x*y + s*z, t*y*y + c, t*y*z - s*x],
+            [t*x*z - s*y, t*y*z + s*x, t*z*z + c]])
+        m = np.identity(size)
+        m[:3, :3] = rot
+        return cls._from_array(m)
+
+    def __len__(self):
+        return len(self._m)
+
+    def __iter__(self):
+        return (Vector(row) for row in self._m)
+
+    def __getitem__(self, i):
+        return Vector(self._m[i])
+
+    def __eq__(self, other):
+        return isinstance(other, Matrix) and bool(np.all(self._m == other._m))
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __matmul__(self, other):
+        if isinstance(other, Matrix):
+            return Matrix._from_array(self._m @ other._m)
+        v = np.asarray(other[:], dtype=np.float64)
+        if len(v) == 3 and len(self._m) == 4:
+            return Vector(self._m[:3, :3] @ v + self._m[:3, 3])
+        return Vector(self._m @ v)
+
+    def __repr__(self):
+        return f'Matrix({self._m.tolist()})'
+
+    def copy(self):
+        return Matrix._from_array(self._m)
+
+    def inverted(self):
+        return Matrix._from_array(np.linalg.inv(self._m))
+
+    def to_4x4(self):
+        m = np.identity(4)
+        n = len(self._m)
+        m[:n, :n] = self._m
+        return Matrix._from_array(m)
+
+
+class Euler:
+    def __init__(self, angles=(0.0, 0.0, 0.0), order='XYZ'):
+        self.angles = list(angles)
+        self.order = order
+
+    def to_matrix(self):
+        m = Matrix.Identity(3)
+        for axis in self.order:
+            m = Matrix.Rotation(self.angles['XYZ'.index(axis)], 3, axis) @ m
+        return m
+
+
+class Quaternion:
+    def __init__(self, wxyz=(1.0, 0.0, 0.0, 0.0)):
+        self.wxyz = list(wxyz)
+
+    def to_matrix(self):
+        w, x, y, z = np.asarray(self.wxyz, dtype=np.float64) / np.linalg.norm(self.wxyz)
+        return Matrix._from_array([
+            [1 - 2*(y*y + z*z), 2*(x*y - z*w), 2*(x*z + y*w)],
+            [2*(x*y + z*w), 1 - 2*(x*x + z*z), 2*(y*z - x*w)],
+            [2*(x*z - y*w), 2*(y*z + x*w), 1 - 2*(x*x + y*y)]])
+
+
+### --- bpy types
+
+class bpy_prop_array(list):
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return tuple(list.__getitem__(self, i))
+        return list.__getitem__(self, i)
+
+
+class _Property:
+    '''Placeholder returned by bpy.props functions (used as class annotation)'''
+    def __init__(self, **kwargs):
+        self.kwargs = kwargs
+        self.default = kwargs.get('default')
+
+
+def _props_defaults(cls):
+    defaults = {}
+    for klass in reversed(cls.__mro__):
+        for name, prop in getattr(klass, '__annotations__', {}).items():
+            if isinstance(prop, _Property):
+                defaults[name] = prop.default
+    return defaults
+
+
+class _RNAStruct:
+    '''Base of registrable classes, properties annotations are set to their default on instance'''
+    def __init__(self, **props):
+        for name, value in _props_defaults(type(self)).items():
+            setattr(self, name, value)
+        for name, value in props.items():
+            setattr(self, name, value)
+
+
+class Operator(_RNAStruct):
+    def __init__(self, **props):
+        super().__init__(**props)
+        self.reports = []
+
+    def report(self, level, message):
+        self.reports.append((set(level), message))
+
+
+class Panel(_RNAStruct):
+    pass
+
+
+class AddonPreferences(_RNAStruct):
+    pass
+
+
+### --- grease pencil data
+
+## point attributes storage: (name, item size, default)
+point_storage = (
+    ('co', 3, 0.0),
+    ('pressure', 1, 1.0),
+    ('strength', 1, 1.0),
+    ('vertex_color', 4, 0.0),
+    ('uv_fill', 2, 0.5),
+    ('uv_factor', 1, 0.0),
+    ('uv_rotation', 1, 0.0),
+    ('select', 1, False),
+)
+
+_point_specs = {name: (size, default) for name, size, default in point_storage}
+
+
+class GPencilStrokePoint:
+    '''Proxy on one index of the points arrays'''
+    __slots__ = ('_points', '_index')
+
+    def __init__(self, points, index):
+        object.__setattr__(self, '_points', points)
+        object.__setattr__(self, '_index', index)
+
+    def __getattr__(self, name):
+        if name not in _point_specs:
+            raise AttributeError(f"'GPencilStrokePoint' object has no attribute '{name}'")
+        value = self._points._data[name][self._index]
+        if name == 'select':
+            return bool(value)
+        if name == 'vertex_color':
+            return bpy_prop_array(value.tolist())
+        if _point_specs[name][0] > 1:
+            return Vector(value)
+        return float(value)
+
+    def __setattr__(self, name, value):
+        if name not in _point_specs:
+            raise AttributeError(f"'GPencilStrokePoint' object has no attribute '{name}'")
+        self._points._data[name][self._index] = value[:] if hasattr(value, '__getitem__') else value
+
+
+class GPencilStrokePoints:
+    def __init__(self):
+        self._data = {}
+        self._resize(0)
+
+    def _resize(self, n):
+        for name, size, default in point_storage:
+            dtype = bool if name == 'select' else np.float32
+            shape = (n, size) if size > 1 else (n,)
+            arr = np.full(shape, default, dtype=dtype)
+            old = self._data.get(name)
+            if old is not None:
+                arr[:len(old)] = old[:n]
+            self._data[name] = arr
+
+    def __len__(self):
+        return len(self._data['co'])
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError('bpy_prop_collection[index]: index out of range')
+        return GPencilStrokePoint(self, i)
+
+    def __iter__(self):
+        return (GPencilStrokePoint(self, i) for i in range(len(self)))
+
+    def add(self, count, pressure=1.0, strength=1.0):
+        n = len(self)
+        self._resize(n + count)
+        self._data['pressure'][n:] = pressure
+        self._data['strength'][n:] = strength
+
+    def _buffer(self, att, seq):
+        if att not in _point_specs:
+            raise AttributeError(f"foreach_get/set: attribute '{att}' not found")
+        arr = self._data[att]
+        if len(seq) != arr.size:
+            raise RuntimeError(f"foreach_get/set: array length mismatch (expected {arr.size}, got {len(seq)})")
+        return arr
+
+    def foreach_get(self, att, seq):
+        arr = self._buffer(att, seq)
+        seq[:] = arr.ravel()
+
+    def foreach_set(self, att, seq):
+        arr = self._buffer(att, seq)
+        arr.ravel()[:] = np.asarray(seq, dtype=arr.dtype).ravel()
+
+    def update(self):
+        pass
+
+
+class GPencilStroke:
+    def __init__(self):
+        self.points = GPencilStrokePoints()
+        self.line_width = 10
+        self.material_index = 0
+        self.use_cyclic = False
+        self.display_mode = '3DSPACE'
+        self.start_cap_mode = 'ROUND'
+        self.end_cap_mode = 'ROUND'
+        self.hardness = 1.0
+        self.uv_scale = 1.0
+        self.uv_rotation = 0.0
+        self.uv_translation = Vector((0.0, 0.0))
+        self.vertex_color_fill = bpy_prop_array((0.0, 0.0, 0.0, 0.0))
+
+    def __setattr__(self, name, value):
+        if name == 'uv_translation':
+            value = Vector(value[:])
+        elif name == 'vertex_color_fill':
+            value = bpy_prop_array(value[:])
+        object.__setattr__(self, name, value)
+
+    @property
+    def select(self):
+        return bool(self.points._data['select'].any())
+
+    @select.setter
+    def select(self, value):
+        self.points._data['select'][:] = value
+
+
+class _Collection:
+    def __init__(self):
+        self._items = []
+
+    def __len__(self):
+        return len(self._items)
+
+    def __iter__(self):
+        # iterate on a snapshot, like looping over a python list of rna items
+        return iter(list(self._items))
+
+    def __getitem__(self, i):
+        if isinstance(i, str):
+            for item in self._items:
+                if self._name(item) == i:
+                    return item
+            raise KeyError(f'bpy_prop_collection[key]: key "{i}" not found')
+        return self._items[i]
+
+    def get(self, name, default=None):
+        for item in self._items:
+            if self._name(item) == name:
+                return item
+        return default
+
+    def _name(self, item):
+        return getattr(item, 'name', None)
+
+    def remove(self, item):
+        self._items.remove(item)
+
+
+class GPencilStrokes(_Collection):
+    def new(self):
+        s = GPencilStroke()
+        self._items.append(s)
+        return s
+
+
+class GPencilFrame:
+    def __init__(self, frame_number):
+        self.frame_number = frame_number
+        self.strokes = GPencilStrokes()
+
+
+class GPencilFrames(_Collection):
+    def new(self, frame_number, active=False):
+        if any(f.frame_number == frame_number for f in self._items):
+            raise RuntimeError(f'Frame {frame_number} already exists')
+        f = GPencilFrame(frame_number)
+        self._items.append(f)
+        self._items.sort(key=lambda f: f.frame_number)
+        return f
+
+
+class GPencilLayer:
+    def __init__(self, info, scene):
+        self.info = info
+        self.hide = False
+        self.lock = False
+        self.select = True
+        self.parent = None
+        self.parent_type = 'OBJECT'
+        self.parent_bone = ''
+        self.matrix_inverse = Matrix.Identity(4)
+        self.frames = GPencilFrames()
+        self._scene = scene
+
+    @property
+    def is_parented(self):
+        return self.parent is not None
+
+    @property
+    def active_frame(self):
+        current = None
+        for f in self.frames:
+            if f.frame_number <= self._scene.frame_current:
+                current = f
+        return current
+
+
+class GPencilLayers(_Collection):
+    def __init__(self, scene):
+        super().__init__()
+        self._scene = scene
+        self.active = None
+
+    def _name(self, item):
+        return item.info
+
+    def new(self, name, set_active=True):
+        l = GPencilLayer(name, self._scene)
+        self._items.append(l)
+        if set_active or self.active is None:
+            self.active = l
+        return l
+
+    def remove(self, layer):
+        super().remove(layer)
+        if self.active is layer:
+            self.active = self._items[-1] if self._items else None
+
+
+class GreasePencil:
+    def __init__(self, name, scene):
+        self.name = name
+        self.layers = GPencilLayers(scene)
+
+
+### --- objects, animation, scene
+
+class FCurve:
+    '''Linear fcurve: value = base + slope * frame'''
+    def __init__(self, data_path, array_index, base=0.0, slope=0.0):
+        self.data_path = data_path
+        self.array_index = array_index
+        self.base = base
+        self.slope = slope
+
+    def evaluate(self, frame):
+        return self.base + self.slope * frame
+
+
+class Action:
+    def __init__(self, fcurves=()):
+        self.fcurves = list(fcurves)
+
+
+class AnimData:
+    def __init__(self, action=None):
+        self.action = action
+        self.drivers = []
+        self.nla_tracks = []
+
+
+class PoseBone:
+    def __init__(self, name, matrix=None):
+        self.name = name
+        self.matrix = matrix or Matrix.Identity(4)
+
+
+class Pose:
+    def __init__(self):
+        self.bones = _Collection()
+
+
+class Object:
+    def __init__(self, name, data, scene, type='GPENCIL'):
+        self.name = name
+        self.type = type
+        self.data = data
+        self.parent = None
+        self.constraints = []
+        self.animation_data = None
+        self.location = Vector((0.0, 0.0, 0.0))
+        self.rotation_mode = 'XYZ'
+        self.rotation_euler = Vector((0.0, 0.0, 0.0))
+        self.rotation_quaternion = Vector((1.0, 0.0, 0.0, 0.0))
+        self.rotation_axis_angle = Vector((0.0, 0.0, 1.0, 0.0))
+        self.scale = Vector((1.0, 1.0, 1.0))
+        self.delta_location = Vector((0.0, 0.0, 0.0))
+        self.delta_rotation_euler = Vector((0.0, 0.0, 0.0))
+        self.delta_rotation_quaternion = Vector((1.0, 0.0, 0.0, 0.0))
+        self.delta_scale = Vector((1.0, 1.0, 1.0))
+        self.pose = Pose() if type == 'ARMATURE' else None
+        self._scene = scene
+
+    def _channel(self, path, frame):
+        values = list(getattr(self, path))
+        action = self.animation_data.action if self.animation_data else None
+        if action:
+            for fc in action.fcurves:
+                if fc.data_path == path:
+                    values[fc.array_index] = fc.evaluate(frame)
+        return values
+
+    @property
+    def matrix_world(self):
+        frame = self._scene.frame_current
+        loc = Matrix.Translation(self._channel('location', frame))
+        rot = Euler(self._channel('rotation_euler', frame), self.rotation_mode).to_matrix().to_4x4()
+        scale = Matrix.Diagonal(self._channel('scale', frame)).to_4x4()
+        mat = loc @ rot @ scale
+        if self.parent:
+            mat = self.parent.matrix_world @ mat
+        return mat
+
+
+class Scene:
+    def __init__(self):
+        self.frame_current = 1
+        self.frame_start = 1
+        self.frame_end = 250
+
+    def frame_set(self, frame, subframe=0.0):
+        self.frame_current = frame
+        for func in list(app.handlers.frame_change_post):
+            func(self, None)
+
+
+class KeyMapItems(list):
+    def new(self, idname, type, value, **kwargs):
+        kmi = types.SimpleNamespace(idname=idname, type=type, value=value, repeat=True, **kwargs)
+        self.append(kmi)
+        return kmi
+
+
+class KeyMaps(list):
+    def new(self, name, **kwargs):
+        km = types.SimpleNamespace(name=name, keymap_items=KeyMapItems(), **kwargs)
+        self.append(km)
+        return km
+
+
+class WindowManager:
+    def __init__(self):
+        self.clipboard = ''
+        self.keyconfigs = types.SimpleNamespace(addon=types.SimpleNamespace(keymaps=KeyMaps()))
+        self.timers = []
+        self.windows = []
+        self.modal_handlers = []
+        self.progress = None
+
+    def event_timer_add(self, time_step, window=None):
+        timer = types.SimpleNamespace(time_step=time_step, window=window)
+        self.timers.append(timer)
+        return timer
+
+    def event_timer_remove(self, timer):
+        self.timers.remove(timer)
+
+    def invoke_props_dialog(self, operator, width=300):
+        '''Dialog confirmed at once with current properties'''
+        return operator.execute(context)
+
+    def modal_handler_add(self, operator):
+        self.modal_handlers.append(operator)
+        return True
+
+    def progress_begin(self, min, max):
+        self.progress = [min, max, min]
+
+    def progress_update(self, value):
+        self.progress[2] = value
+
+    def progress_end(self):
+        self.progress = None
+
+
+class WorkSpace:
+    def __init__(self):
+        self.status_text = None
+
+    def status_text_set(self, text):
+        self.status_text = text
+
+
+class _AddonEntry:
+    def __init__(self, prefs_class):
+        self.preferences = prefs_class() if prefs_class else None
+
+
+class _Addons(dict):
+    def __missing__(self, name):
+        entry = self[name] = _AddonEntry(_addon_prefs_classes.get(name))
+        return entry
+
+
+_addon_prefs_classes = {}
+
+
+class Preferences:
+    def __init__(self):
+        self.addons = _Addons()
+
+
+class Context:
+    def __init__(self):
+        self.scene = Scene()
+        self.object = None
+        self.window_manager = WindowManager()
+        self.window = types.SimpleNamespace()
+        self.workspace = WorkSpace()
+        self.preferences = Preferences()
+
+
+### --- bpy module assembly
+
+def _prop(**kwargs):
+    return _Property(**kwargs)
+
+def persistent(func):
+    return func
+
+def register_class(cls):
+    if issubclass(cls, AddonPreferences):
+        _addon_prefs_classes[cls.bl_idname] = cls
+
+def unregister_class(cls):
+    pass
+
+class Timers:
+    '''bpy.app.timers, functions are only called by run_timers()'''
+    def __init__(self):
+        self.registered = {}# function: next call time
+
+    def register(self, function, first_interval=0.0, persistent=False):
+        self.registered[function] = time.perf_counter() + first_interval
+
+    def unregister(self, function):
+        del self.registered[function]
+
+    def is_registered(self, function):
+        return function in self.registered
+
+
+def run_timers(timeout=60.0):
+    '''Call registered timers when due until none is left (or timeout), return number of calls'''
+    timers = app.timers.registered
+    calls = 0
+    end = time.perf_counter() + timeout
+    while timers and time.perf_counter() < end:
+        function, due = min(timers.items(), key=lambda item: item[1])
+        time.sleep(max(0.0, due - time.perf_counter()))
+        interval = function()
+        calls += 1
+        if function not in timers:
+            continue
+        if interval is None:
+            del timers[function]
+        else:
+            timers[function] = time.perf_counter() + interval
+    return calls
+
+
+app = types.SimpleNamespace(
+    timers=Timers(),
+    handlers=types.SimpleNamespace(
+        frame_change_post=[],
+        depsgraph_update_post=[],
+        load_post=[],
+        persistent=persistent,
+    ),
+    version=(2, 93, 0),
+)
+
+context = Context()
+
+
+def install():
+    '''Register fake bpy and mathutils modules in sys.modules (real ones are never replaced)'''
+    if 'bpy' in sys.modules and not getattr(sys.modules['bpy'], 'is_fake', False):
+        raise RuntimeError('A real bpy module is already loaded')
+
+    mathutils = types.ModuleType('mathutils')
+    mathutils.Vector = Vector
+    mathutils.Color = Color
+    mathutils.Matrix = Matrix
+    mathutils.Euler = Euler
+    mathutils.Quaternion = Quaternion
+
+    bpy = types.ModuleType('bpy')
+    bpy.is_fake = True
+    bpy.context = context
+    bpy.app = app
+    bpy.types = types.SimpleNamespace(
+        Operator=Operator, Panel=Panel, AddonPreferences=AddonPreferences, bpy_prop_array=bpy_prop_array)
+    bpy.props = types.SimpleNamespace(**{name: _prop for name in (
+        'BoolProperty', 'IntProperty', 'FloatProperty', 'StringProperty', 'EnumProperty')})
+    bpy.utils = types.SimpleNamespace(register_class=register_class, unregister_class=unregister_class)
+    bpy.path = types.SimpleNamespace(abspath=lambda path: os.path.abspath(path.lstrip('/')) if path.startswith('//') else path)
+
+    handlers = types.ModuleType('bpy.app.handlers')
+    handlers.persistent = persistent
+    app_module = types.ModuleType('bpy.app')
+    app_module.handlers = handlers
+
+    sys.modules['mathutils'] = mathutils
+    sys.modules['bpy'] = bpy
+    sys.modules['bpy.app'] = app_module
+    sys.modules['bpy.app.handlers'] = handlers
+    return bpy
+
+
+def load_addon(name='gp_clipboard'):
+    '''Install the fake modules and import the addon package from the repository root'''
+    install()
+    if name in sys.modules:
+        return sys.modules[name]
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    spec = importlib.util.spec_from_file_location(name, os.path.join(root, '__init__.py'),
+        submodule_search_locations=[root])
+    addon = importlib.util.module_from_spec(spec)
+    sys.modules[name] = addon
+    spec.loader.exec_module(addon)
+    addon.register()
+    return addon
+
+
+def run_operator(cls, **props):
+    '''Call an operator execute with default (or given) properties, return (result, reports)'''
+    op = cls(**props)
+    result = op.execute(context)
+    return result, op.reports
+
+
+def run_modal(cls, cancel_after=None, **props):
+    '''Call an operator invoke then send timer events until it stop running,
+    an Esc event is sent instead after cancel_after timer events
+    return (result, reports, number of modal calls)
+    '''
+    op = cls(**props)
+    result = op.invoke(context, types.SimpleNamespace(type='NONE', value='NOTHING'))
+    calls = 0
+    while 'RUNNING_MODAL' in result:
+        calls += 1
+        cancel = cancel_after is not None and calls > cancel_after
+        event = types.SimpleNamespace(type='ESC' if cancel else 'TIMER', value='PRESS')
+        result = op.modal(context, event)
+    if op in context.window_manager.modal_handlers:
+        context.window_manager.modal_handlers.remove(op)
+    return result, op.reports, calls
+
+
+### --- synthetic scene
+
+def make_scene(layers=1, frames=1, strokes=10, points=50, parented=False, bone_parent=False,
+    animated=False, frame_step=1, select=True, seed=0):
+    '''Build a fresh scene with a grease pencil object set as context object:
+    layers x frames (keys every frame_step) x strokes x points (random walk coordinates)
+    parented: layers parented to an animated empty, bone_parent: parented to a pose bone
+    animated: object location animated with a linear fcurve (matrix change every frame)
+    return the grease pencil object
+    '''
+    rng = np.random.default_rng(seed)
+    scene = context.scene = Scene()
+    scene.frame_end = max(scene.frame_start + frames * frame_step, scene.frame_start + 1)
+    context.window_manager.clipboard = ''
+
+    gp = GreasePencil('Stroke', scene)
+    obj = Object('Stroke', gp, scene)
+    context.object = obj
+
+    if animated:
+        obj.animation_data = AnimData(Action([FCurve('location', 0, 0.0, 0.01), FCurve('location', 2, 0.0, 0.005)]))
+
+    parent = None
+    if bone_parent:
+        parent = Object('Armature', None, scene, type='ARMATURE')
+        parent.location = Vector((0.5, 0.0, 0.0))
+        parent.pose.bones._items.append(PoseBone('Bone', Matrix.Translation((0.0, 0.0, 1.0))))
+    elif parented:
+        parent = Object('Empty', None, scene, type='EMPTY')
+        parent.animation_data = AnimData(Action([FCurve('location', 1, 0.0, 0.02)]))
+
+    for li in range(layers):
+        l = gp.layers.new(f'Layer_{li}')
+        if parent:
+            l.parent = parent
+            if bone_parent:
+                l.parent_type = 'BONE'
+                l.parent_bone = 'Bone'
+        for fi in range(frames):
+            f = l.frames.new(scene.frame_start + fi * frame_step)
+            for _si in range(strokes):
+                s = f.strokes.new()
+                s.line_width = int(rng.integers(5, 50))
+                s.points.add(points)
+                co = np.cumsum(rng.normal(0.0, 0.01, (points, 3)), axis=0) + rng.uniform(-1.0, 1.0, 3)
+                s.points.foreach_set('co', co.astype(np.float32).ravel())
+                s.points.foreach_set('pressure', rng.uniform(0.2, 1.0, points).astype(np.float32))
+                s.points.foreach_set('select', np.full(points, select))
+
+    # like a file load
+    for func in list(app.handlers.load_post):
+        func(None)
+    return obj
@@ -0,0 +1,446 @@
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTIBILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+'''Headless regression tests of GP clipboard on the fake data model (dev/fake_bpy.py)
+
+    python -m pytest dev
+'''
+
+import os
+import sys
+import types
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from fake_bpy import load_addon, make_scene, run_operator, run_modal, run_timers, context
+
+addon = load_addon()
+clipformat = addon.clipformat
+
+FORMATS = ['BINARY', 'JSON'] + (['SHARED_MEMORY'] if addon.clipshm.available else [])
+
+
+@pytest.fixture(autouse=True)
+def defaults():
+    '''Default preferences and empty caches for each test'''
+    prefs = addon.get_addon_prefs()
+    prefs.clipboard_format = 'BINARY'
+    prefs.precision = 'FULL'
+    prefs.decoded_cache_size = 256
+    prefs.encoded_cache_size = 256
+    prefs.background_encode = True
+    prefs.paste_slice = 50
+    prefs.spill_size = 32
+    addon.decoded_cache.clear()
+    addon.encoded_cache.clear()
+    addon.history.clear()
+    yield prefs
+    run_timers()
+    addon.clipshm.release_all()
+
+
+def read_points(s, names=('co', 'pressure', 'strength')):
+    n = len(s.points)
+    arrays = {}
+    for name in names:
+        size = 3 if name == 'co' else 1
+        arr = np.empty(n * size, dtype=np.float32)
+        s.points.foreach_get(name, arr)
+        arrays[name] = arr.reshape(n, size) if size > 1 else arr
+    return arrays
+
+def layers_points(obj):
+    '''{(layer, frame): [points arrays of each stroke]}'''
+    return {(l.info, f.frame_number): [read_points(s) for s in f.strokes]
+        for l in obj.data.layers for f in l.frames}
+
+def clear_frames(obj):
+    for l in obj.data.layers:
+        for f in list(l.frames):
+            l.frames.remove(f)
+
+def assert_points_equal(expected, result, atol):
+    assert len(expected) == len(result)
+    for a, b in zip(expected, result):
+        for name in a:
+            np.testing.assert_allclose(b[name], a[name], atol=atol)
+
+def synthetic_strokes(count=5, points=30, seed=0):
+    rng = np.random.default_rng(seed)
+    strokes = []
+    for _i in range(count):
+        co = np.cumsum(rng.normal(0.0, 0.01, (points, 3)), axis=0) + rng.uniform(-1.0, 1.0, 3)
+        strokes.append({'line_width': int(rng.integers(5, 50)), 'points': {
+            'co': co.astype(np.float32),
+            'pressure': rng.uniform(0.2, 1.0, points).astype(np.float32),
+            'strength': rng.uniform(0.2, 1.0, points).astype(np.float32),
+        }})
+    return strokes
+
+
+### --- roundtrips
+
+@pytest.mark.parametrize('fmt', FORMATS)
+def test_strokes_roundtrip(defaults, fmt):
+    defaults.clipboard_format = fmt
+    obj = make_scene(layers=1, frames=1, strokes=6, points=40)
+    frame = obj.data.layers[0].frames[0]
+    expected = [read_points(s) for s in frame.strokes]
+
+    assert run_operator(addon.GPCLIP_OT_copy_strokes)[0] == {'FINISHED'}
+    assert run_operator(addon.GPCLIP_OT_paste_strokes)[0] == {'FINISHED'}
+    pasted = [read_points(s) for s in frame.strokes][len(expected):]
+    assert_points_equal(expected, pasted, atol=1e-5)
+
+@pytest.mark.parametrize('track', [False, True])
+@pytest.mark.parametrize('fmt', FORMATS)
+def test_layers_roundtrip(defaults, fmt, track):
+    defaults.clipboard_format = fmt
+    obj = make_scene(layers=2, frames=4, strokes=5, points=30, animated=True, parented=True)
+    expected = layers_points(obj)
+
+    run_operator(addon.GPCLIP_OT_copy_multi_strokes, use_transform_track=track)
+    clear_frames(obj)
+    assert run_operator(addon.GPCLIP_OT_paste_multi_strokes)[0] == {'FINISHED'}
+    result = layers_points(obj)
+    assert result.keys() == expected.keys()
+    for key in expected:
+        assert_points_equal(expected[key], result[key], atol=1e-5)
+
+def test_reduced_precision_roundtrip(defaults):
+    defaults.precision = 'REDUCED'
+    obj = make_scene(layers=1, frames=3, strokes=5, points=30)
+    expected = layers_points(obj)
+
+    _result, reports = run_operator(addon.GPCLIP_OT_copy_multi_strokes)
+    assert 'max error' in reports[-1][1]
+    clear_frames(obj)
+    run_operator(addon.GPCLIP_OT_paste_multi_strokes)
+    result = layers_points(obj)
+    for key in expected:
+        assert_points_equal(expected[key], result[key], atol=1e-3)
+
+@pytest.mark.parametrize('compress', [True, False])
+def test_container_lossless_encodings(compress):
+    strokes = synthetic_strokes()
+    data = {'A': {1: strokes, 2: strokes, 3: synthetic_strokes(seed=1)}}
+    container = clipformat.encode_container(data, compress=compress, delta=compress)
+    meta, _start = clipformat.read_meta(container)
+    assert meta['data']['A']['1'] == meta['data']['A']['2']# identical drawings stored once
+
+    decoded = clipformat.decode_container(container)
+    for fnum, frame_strokes in data['A'].items():
+        for a, b in zip(frame_strokes, decoded['A'][fnum]):
+            assert a['line_width'] == b['line_width']
+            for name, values in a['points'].items():
+                np.testing.assert_array_equal(np.reshape(b['points'][name], values.shape), values)
+
+def test_container_quantized_error_within_report():
+    strokes = synthetic_strokes()
+    errors = {}
+    container = clipformat.encode_container(strokes, bits=12, half=True, errors=errors, delta=True)
+    decoded = clipformat.decode_container(container)
+    assert errors['co'] > 0
+    for a, b in zip(strokes, decoded):
+        for name, values in a['points'].items():
+            error = np.abs(np.reshape(b['points'][name], values.shape) - values).max()
+            assert error <= errors[name] + 1e-7
+
+def test_selected_frames_decode_only_needed_blocks():
+    data = {'A': {f: synthetic_strokes(seed=f) for f in range(1, 6)}, 'B': {1: synthetic_strokes(seed=9)}}
+    container = clipformat.encode_container(data)
+    frames = [(layer, fnum) for layer, fnum, _strokes in
+        clipformat.iter_layer_frames(container, layers=['A'], frame_range=(2, 3))]
+    assert frames == [('A', 2), ('A', 3)]
+
+
+### --- cut segmentation
+
+def single_stroke_scene(points=10, cyclic=False):
+    obj = make_scene(layers=1, frames=1, strokes=1, points=points, select=False)
+    s = obj.data.layers[0].frames[0].strokes[0]
+    s.use_cyclic = cyclic
+    return obj, s
+
+def select_points(s, indexes):
+    mask = np.zeros(len(s.points), dtype=bool)
+    mask[indexes] = True
+    s.points.foreach_set('select', mask)
+
+def test_cut_open_stroke(defaults):
+    obj, s = single_stroke_scene()
+    co = read_points(s)['co']
+    select_points(s, [3, 4, 5])
+
+    run_operator(addon.GPCLIP_OT_cut_strokes)
+    copied = addon.read_clipboard()
+    assert len(copied) == 1
+    np.testing.assert_allclose(np.reshape(copied[0]['points']['co'], (-1, 3)), co[3:6], atol=1e-6)
+
+    ## staying parts overlap the cut by one point
+    remaining = [read_points(ns)['co'] for ns in obj.data.layers[0].frames[0].strokes]
+    assert [len(r) for r in remaining] == [4, 5]
+    np.testing.assert_allclose(remaining[0], co[0:4])
+    np.testing.assert_allclose(remaining[1], co[5:10])
+
+def test_cut_cyclic_stroke_wraps_around(defaults):
+    obj, s = single_stroke_scene(cyclic=True)
+    co = read_points(s)['co']
+    select_points(s, [8, 9, 0, 1, 2])
+
+    run_operator(addon.GPCLIP_OT_cut_strokes)
+    copied = addon.read_clipboard()
+    assert len(copied) == 1
+    np.testing.assert_allclose(np.reshape(copied[0]['points']['co'], (-1, 3)), co[[8, 9, 0, 1, 2]], atol=1e-6)
+
+    remaining = list(obj.data.layers[0].frames[0].strokes)
+    assert len(remaining) == 1
+    assert not remaining[0].use_cyclic
+    np.testing.assert_allclose(read_points(remaining[0])['co'], co[2:9])
+
+
+def test_cut_cyclic_stroke_keeps_wrapping_part(defaults):
+    obj, s = single_stroke_scene(cyclic=True)
+    co = read_points(s)['co']
+    select_points(s, [3, 4, 5])
+
+    run_operator(addon.GPCLIP_OT_cut_strokes)
+    remaining = list(obj.data.layers[0].frames[0].strokes)
+    assert len(remaining) == 1
+    np.testing.assert_allclose(read_points(remaining[0])['co'], co[[5, 6, 7, 8, 9, 0, 1, 2, 3]])
+
+### --- caches
+
+def test_decoded_cache_picks_up_edits(defaults):
+    obj = make_scene(layers=1, frames=1, strokes=3, points=20)
+    frame = obj.data.layers[0].frames[0]
+    run_operator(addon.GPCLIP_OT_copy_strokes)
+    first = addon.read_clipboard()
+    assert addon.read_clipboard() is first# same clipboard: cache hit
+
+    s = frame.strokes[0]
+    co = read_points(s)['co'] + 0.5
+    s.points.foreach_set('co', co.ravel())
+    run_operator(addon.GPCLIP_OT_copy_strokes)
+    second = addon.read_clipboard()
+    assert second is not first
+    np.testing.assert_allclose(np.reshape(second[0]['points']['co'], (-1, 3)), co, atol=1e-6)
+
+def test_encoded_cache_reuse_matches_fresh_encode(defaults):
+    obj = make_scene(layers=2, frames=5, strokes=4, points=20)
+    run_operator(addon.GPCLIP_OT_copy_multi_strokes)
+
+    s = obj.data.layers[0].frames[2].strokes[1]
+    s.points.foreach_set('co', (read_points(s)['co'] + 0.5).ravel())
+    run_operator(addon.GPCLIP_OT_copy_multi_strokes)
+    cached = context.window_manager.clipboard
+    trace = addon.tracer.history[-1]
+    assert trace.counts['reused_blocks'] == 9
+    assert trace.counts['strokes'] == 4# only the edited frame is extracted again
+
+    defaults.encoded_cache_size = 0
+    run_operator(addon.GPCLIP_OT_copy_multi_strokes)
+    assert context.window_manager.clipboard == cached
+
+
+### --- modal paste
+
+def layers_copy_and_clear(**scene):
+    obj = make_scene(**scene)
+    expected = layers_points(obj)
+    run_operator(addon.GPCLIP_OT_copy_multi_strokes)
+    clear_frames(obj)
+    return obj, expected
+
+def test_modal_paste_by_slices(defaults):
+    defaults.paste_slice = 0# one frame per slice
+    obj, expected = layers_copy_and_clear(layers=2, frames=4, strokes=3, points=10)
+
+    result, _reports, calls = run_modal(addon.GPCLIP_OT_paste_multi_strokes)
+    assert result == {'FINISHED'}
+    assert calls >= 8
+    result = layers_points(obj)
+    for key in expected:
+        assert_points_equal(expected[key], result[key], atol=1e-5)
+
+def test_modal_paste_cancel_rollback(defaults):
+    defaults.paste_slice = 0
+    obj, _expected = layers_copy_and_clear(layers=2, frames=4, strokes=3, points=10)
+    before = layers_points(obj)
+
+    result, reports, _calls = run_modal(addon.GPCLIP_OT_paste_multi_strokes, cancel_after=12)
+    assert result == {'CANCELLED'}
+    assert reports[-1][1].startswith('Paste cancelled') and ', 0 pasted' not in reports[-1][1]
+    assert layers_points(obj) == before
+
+def test_modal_paste_consume_edit_events(defaults):
+    defaults.paste_slice = 0
+    layers_copy_and_clear(layers=1, frames=4, strokes=3, points=10)
+    op = addon.GPCLIP_OT_paste_multi_strokes()
+    assert op.invoke(context, types.SimpleNamespace(type='NONE')) == {'RUNNING_MODAL'}
+    assert op.modal(context, types.SimpleNamespace(type='MIDDLEMOUSE')) == {'PASS_THROUGH'}
+    assert op.modal(context, types.SimpleNamespace(type='Z')) == {'RUNNING_MODAL'}
+    assert op.modal(context, types.SimpleNamespace(type='ESC')) == {'CANCELLED'}
+
+def test_modal_paste_error_rollback(defaults, monkeypatch):
+    defaults.paste_slice = 0
+    obj, _expected = layers_copy_and_clear(layers=2, frames=4, strokes=3, points=10)
+    before = layers_points(obj)
+    add_stroke = addon.add_stroke
+    calls = []
+    def failing_add_stroke(*args, **kwargs):
+        calls.append(1)
+        if len(calls) > 5:
+            raise RuntimeError('paste error')
+        return add_stroke(*args, **kwargs)
+    monkeypatch.setattr(addon, 'add_stroke', failing_add_stroke)
+
+    with pytest.raises(RuntimeError):
+        run_modal(addon.GPCLIP_OT_paste_multi_strokes)
+    assert layers_points(obj) == before
+
+
+### --- background copy
+
+def test_background_copy(defaults):
+    make_scene(layers=2, frames=3, strokes=4, points=20)
+    run_operator(addon.GPCLIP_OT_copy_multi_strokes)
+    expected = context.window_manager.clipboard
+    context.window_manager.clipboard = ''
+
+    result, reports, _calls = run_modal(addon.GPCLIP_OT_copy_multi_strokes)
+    assert result == {'FINISHED'}
+    assert 'encoding in background' in reports[-1][1]
+    run_timers()
+    assert context.window_manager.clipboard == expected
+    assert 'Copied layers' in addon.background_status
+
+def test_paste_wait_for_pending_copy(defaults):
+    obj = make_scene(layers=2, frames=3, strokes=4, points=20)
+    expected = layers_points(obj)
+    run_modal(addon.GPCLIP_OT_copy_multi_strokes)
+    clear_frames(obj)
+
+    assert run_operator(addon.GPCLIP_OT_paste_multi_strokes)[0] == {'FINISHED'}
+    assert addon.pending_copy is None
+    result = layers_points(obj)
+    for key in expected:
+        assert_points_equal(expected[key], result[key], atol=1e-5)
+
+
+### --- disk cache spill
+
+@pytest.fixture
+def spill(defaults, tmp_path):
+    defaults.spill_size = 1
+    defaults.cache_budget = 1
+    defaults.cache_directory = str(tmp_path)
+    yield tmp_path
+    defaults.cache_directory = ''
+    defaults.cache_budget = 2048
+
+def test_spill_token_paste(spill):
+    obj = make_scene(layers=1, frames=1, strokes=100, points=2000)
+    frame = obj.data.layers[0].frames[0]
+    expected = [read_points(s) for s in frame.strokes]
+    run_operator(addon.GPCLIP_OT_copy_strokes)
+    token = context.window_manager.clipboard
+    assert addon.clipstore.is_token(token)
+    assert os.path.exists(addon.clipstore.file_path(addon.clipstore.parse_token(token)[0]))
+
+    assert run_operator(addon.GPCLIP_OT_paste_strokes)[0] == {'FINISHED'}
+    assert_points_equal(expected, [read_points(s) for s in frame.strokes][len(expected):], atol=1e-5)
+
+def test_spill_eviction(spill):
+    make_scene(layers=1, frames=1, strokes=100, points=2000, seed=0)
+    run_operator(addon.GPCLIP_OT_copy_strokes)
+    first = context.window_manager.clipboard
+    make_scene(layers=1, frames=1, strokes=100, points=2000, seed=1)
+    run_operator(addon.GPCLIP_OT_copy_strokes)
+    second = context.window_manager.clipboard
+
+    ## over budget: the previous payload is deleted, the last one is kept
+    paths = [path for _mtime, _size, path in addon.clipstore.entries()]
+    assert paths == [addon.clipstore.file_path(addon.clipstore.parse_token(second)[0])]
+
+    context.window_manager.clipboard = first
+    result, reports = run_operator(addon.GPCLIP_OT_paste_strokes)
+    assert result == {'CANCELLED'}
+    assert reports[-1][0] == {'ERROR'}
+
+
+### --- history
+
+def test_history_slot_paste_strokes(defaults):
+    obj = make_scene(layers=1, frames=1, strokes=4, points=20)
+    frame = obj.data.layers[0].frames[0]
+    expected = [read_points(s) for s in frame.strokes]
+    run_operator(addon.GPCLIP_OT_copy_strokes)
+    context.window_manager.clipboard = ''
+
+    slot = addon.history.newest_first()[0]
+    assert run_operator(addon.GPCLIP_OT_paste_slot, slot=slot.uid)[0] == {'FINISHED'}
+    assert_points_equal(expected, [read_points(s) for s in frame.strokes][len(expected):], atol=1e-6)
+
+@pytest.mark.parametrize('track', [False, True])
+def test_history_slot_paste_layers(defaults, track):
+    obj = make_scene(layers=2, frames=4, strokes=3, points=20, animated=True, parented=True)
+    expected = layers_points(obj)
+    run_operator(addon.GPCLIP_OT_copy_multi_strokes, use_transform_track=track)
+    clear_frames(obj)
+
+    slot = addon.history.newest_first()[0]
+    assert bool(slot.tracks) == track
+    assert run_operator(addon.GPCLIP_OT_paste_slot, slot=slot.uid)[0] == {'FINISHED'}
+    result = layers_points(obj)
+    assert result.keys() == expected.keys()
+    for key in expected:
+        assert_points_equal(expected[key], result[key], atol=1e-5)
+
+
+### --- timeline
+
+def test_keyframe_index_active_at():
+    obj = make_scene(layers=1, frames=3, strokes=1, points=5, frame_step=4)
+    layer = obj.data.layers[0]
+    numbers = [f.frame_number for f in layer.frames]
+    keys = addon.KeyframeIndex(layer)
+
+    assert keys.active_at(numbers[0] - 1) is None
+    for fnum in numbers:
+        assert fnum in keys
+        assert fnum + 1 not in keys
+        assert keys.active_at(fnum).frame_number == fnum
+        assert keys.active_at(fnum + 3).frame_number == fnum
+    assert keys.active_at(numbers[-1] + 100).frame_number == numbers[-1]
+
+def test_evaluate_animation_matches_frame_set(defaults, monkeypatch):
+    obj = make_scene(layers=2, frames=4, strokes=3, points=10, animated=True)
+    run_operator(addon.GPCLIP_OT_copy_multi_strokes)
+    stepped = addon.read_clipboard('layers')
+
+    frame_set = context.scene.frame_set
+    calls = []
+    monkeypatch.setattr(context.scene, 'frame_set', lambda fnum: (calls.append(fnum), frame_set(fnum)))
+    run_operator(addon.GPCLIP_OT_copy_multi_strokes, evaluate_animation=True)
+    evaluated = addon.read_clipboard('layers')
+
+    assert len(calls) <= 1# only back to the original frame
+    assert evaluated.keys() == stepped.keys()
+    for layer, frames in stepped.items():
+        assert evaluated[layer].keys() == frames.keys()
+        for fnum, strokes in frames.items():
+            for a, b in zip(strokes, evaluated[layer][fnum]):
+                np.testing.assert_allclose(b['points']['co'], a['points']['co'], atol=1e-5)
@@ -0,0 +1,169 @@
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTIBILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+'''Per phase timing of clipboard operations (no bpy dependency)
+
+    with tracer.operation('paste'):
+        with phase('decode'):
+            ...
+        count('strokes', len(strokes))
+        peak('decoded_bytes', live_bytes)
+
+Phases can nest (a phase duration include its sub-phases) and be entered
+many times in one operation, durations and calls are accumulated.
+The running operation is per thread: work done in a worker thread is
+recorded in its own operation, handed back to be recorded on the main thread
+(history is only changed and read there).
+Finished operations are kept in a rolling history, optionally appended
+to a jsonl trace file, one operation can be run under cProfile.
+'''
+
+import os
+import json
+import cProfile
+import threading
+import tempfile
+from time import time, perf_counter, strftime
+from collections import deque
+from contextlib import contextmanager
+
+
+class OperationTrace:
+    '''Durations and counts recorded during one operation'''
+
+    def __init__(self, name):
+        self.name = name
+        self.timestamp = time()
+        self.phases = {}# phase name: [duration, calls]
+        self.counts = {}
+        self.peaks = {}# name: max value
+        self.total = 0.0
+        self._t0 = perf_counter()
+
+    def add(self, name, duration):
+        entry = self.phases.setdefault(name, [0.0, 0])
+        entry[0] += duration
+        entry[1] += 1
+
+    def count(self, name, n=1):
+        self.counts[name] = self.counts.get(name, 0) + n
+
+    def peak(self, name, value):
+        if name not in self.peaks or value > self.peaks[name]:
+            self.peaks[name] = value
+
+    def finish(self):
+        self.total = perf_counter() - self._t0
+
+    def to_dict(self):
+        return {
+            'operation': self.name,
+            'timestamp': self.timestamp,
+            'total': self.total,
+            'phases': {k: {'time': v[0], 'calls': v[1]} for k, v in self.phases.items()},
+            'counts': self.counts,
+            'peaks': self.peaks,
+        }
+
+    def summary(self, limit=None):
+        '''List of (phase, duration) sorted by longest first'''
+        phases = sorted(((k, v[0]) for k, v in self.phases.items()), key=lambda x: x[1], reverse=True)
+        return phases[:limit] if limit else phases
+
+
+class Tracer:
+    '''Record phases of the running operation and keep history of the last ones'''
+
+    def __init__(self, history_size=20):
+        self.history = deque(maxlen=history_size)
+        self._local = threading.local()
+        self.trace_file = ''# append each operation as a json line if set
+        self.profile_next = False# run next operation under cProfile
+        self.profile_dir = ''# default to temp directory
+        self.last_profile = ''
+
+    @property
+    def current(self):
+        return getattr(self._local, 'trace', None)
+
+    @current.setter
+    def current(self, trace):
+        self._local.trace = trace
+
+    def set_history_size(self, size):
+        if size != self.history.maxlen:
+            self.history = deque(self.history, maxlen=size)
+
+    @contextmanager
+    def operation(self, name, record=True):
+        '''Trace an operation, record=False leave it out of history (for worker threads, see record)'''
+        trace = OperationTrace(name)
+        self.current = trace
+        profiler = None
+        if self.profile_next:
+            self.profile_next = False
+            profiler = cProfile.Profile()
+            profiler.enable()
+        try:
+            yield trace
+        finally:
+            if profiler:
+                profiler.disable()
+                self.last_profile = os.path.join(self.profile_dir or tempfile.gettempdir(),
+                    f'gp_clipboard_{name}_{strftime("%Y%m%d_%H%M%S")}.prof')
+                profiler.dump_stats(self.last_profile)
+                print('GP clipboard profile written to', self.last_profile)
+            trace.finish()
+            self.current = None
+            if record:
+                self.record(trace)
+
+    def record(self, trace):
+        '''Add a finished trace to history (and trace file)'''
+        self.history.append(trace)
+        if self.trace_file:
+            self.write(trace)
+
+    def write(self, trace):
+        try:
+            with open(self.trace_file, 'a') as fd:
+                fd.write(json.dumps(trace.to_dict()) + '\n')
+        except OSError as e:
+            print(f'GP clipboard: cannot write trace to {self.trace_file}: {e}')
+
+    @contextmanager
+    def phase(self, name):
+        trace = self.current
+        if trace is None:
+            yield
+            return
+        t0 = perf_counter()
+        try:
+            yield
+        finally:
+            trace.add(name, perf_counter() - t0)
+
+    def count(self, name, n=1):
+        if self.current is not None:
+            self.current.count(name, n)
+
+    def peak(self, name, value):
+        '''Keep the max value of name in the running operation (memory high water mark...)'''
+        if self.current is not None:
+            self.current.peak(name, value)
+
+
+tracer = Tracer()
+phase = tracer.phase
+count = tracer.count
+peak = tracer.peak